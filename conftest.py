@@ -1,4 +1,17 @@
 import logging
+from collections.abc import Generator
+
+import pytest
+
+from tptools.util import set_trusted_output
 
 logging.getLogger("asyncio").setLevel(logging.WARN)
 logging.getLogger("filelock").setLevel(logging.WARN)
+
+
+@pytest.fixture(autouse=True, scope="session")
+def validate_output() -> Generator[None]:
+    # Tests should catch output that does not match the declared structures:
+    previous = set_trusted_output(False)
+    yield
+    set_trusted_output(previous)
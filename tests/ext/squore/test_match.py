@@ -1,5 +1,11 @@
+import json
+
+import pytest
+
 from tptools import MatchStatus
 from tptools.ext.squore import SquoreCourt, SquoreDraw, SquoreEntry, SquoreMatch
+from tptools.tpmatch import TPMatch
+from tptools.util import set_trusted_output
 
 
 def test_ready_match(sqmatch1: SquoreMatch) -> None:
@@ -16,3 +22,16 @@ def test_pending_match(sqmatch_pending: SquoreMatch) -> None:
     assert sqmatch_pending.court is None
     assert isinstance(sqmatch_pending.A, SquoreEntry)
     assert sqmatch_pending.B == "Unknown"
+
+
+@pytest.mark.filterwarnings("error")
+def test_json_with_trusted_output(tpmatch_won_by_B: TPMatch) -> None:
+    sqmatch = SquoreMatch.from_tpmatch(tpmatch_won_by_B)
+    previous = set_trusted_output(True)
+    try:
+        trusted = sqmatch.model_dump_json()
+
+    finally:
+        set_trusted_output(previous)
+
+    assert json.loads(trusted) == json.loads(sqmatch.model_dump_json())
@@ -1,3 +1,4 @@
+import re
 from dataclasses import dataclass
 
 import pytest
@@ -41,3 +42,45 @@ def test_regexp_application_multiple() -> None:
     assert (
         SomePolicy([rgxp1, rgxp2])._apply_regexps("instr") == "start-of-linexixnxsxtxr"
     )
+
+
+def test_regexp_application_precompiled() -> None:
+    rgxp = RegexpSubstTuple(re.compile(r"[aeiou]"), "")
+    assert SomePolicy([rgxp])._apply_regexps("instr") == "nstr"
+
+
+def test_regexp_application_flags() -> None:
+    rgxp = RegexpSubstTuple("INSTR", "outstr", flags=re.IGNORECASE)
+    assert SomePolicy([rgxp])._apply_regexps("instr") == "outstr"
+
+
+def test_regexp_application_count() -> None:
+    rgxp = RegexpSubstTuple(".", "x", count=2)
+    assert SomePolicy([rgxp])._apply_regexps("instr") == "xxstr"
+
+
+def test_regexp_application_after_with() -> None:
+    policy = SomePolicy([RegexpSubstTuple(".", "x")])
+    assert policy.with_(regexps=None)._apply_regexps("instr") == "instr"
+
+
+def test_params_exclude_regexps() -> None:
+    params = SomePolicy([RegexpSubstTuple(".", "x")]).params()
+    assert set(params) == {"one", "two"}
+
+
+def test_cache_key_same_params() -> None:
+    rgxp = RegexpSubstTuple(".", "x")
+    assert SomePolicy([rgxp]).cache_key == SomePolicy([rgxp]).cache_key
+
+
+def test_cache_key_differs_by_params() -> None:
+    assert SomePolicy().cache_key != SomePolicy(one=2).cache_key
+
+
+def test_cache_key_differs_by_regexps() -> None:
+    assert SomePolicy().cache_key != SomePolicy([RegexpSubstTuple(".", "x")]).cache_key
+
+
+def test_cache_key_hashable() -> None:
+    assert hash(SomePolicy([RegexpSubstTuple(".", "x")]).cache_key)
@@ -0,0 +1,420 @@
+import asyncio
+import json
+import os
+import pathlib
+from typing import IO, Any
+
+import pytest
+
+from tptools.cache import CachedFile, LRUCache, SingleFlight
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingLoader:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def __call__(self, f: IO[bytes]) -> Any:
+        self.calls += 1
+        return json.load(f)
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+@pytest.fixture
+def loader() -> CountingLoader:
+    return CountingLoader()
+
+
+@pytest.fixture
+def jsonfile(tmp_path: pathlib.Path) -> pathlib.Path:
+    path = tmp_path / "data.json"
+    path.write_text('{"a": 1}')
+    return path
+
+
+@pytest.fixture
+def cachedfile(
+    jsonfile: pathlib.Path, loader: CountingLoader, clock: FakeClock
+) -> CachedFile[Any]:
+    return CachedFile(jsonfile, loader, revalidate_interval=10, clock=clock)
+
+
+def _rewrite(path: pathlib.Path, content: str) -> None:
+    # Bump the mtime explicitly, as the filesystem's resolution might be too coarse
+    # to notice the change otherwise
+    st = path.stat()
+    path.write_text(content)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_path(cachedfile: CachedFile[Any], jsonfile: pathlib.Path) -> None:
+    assert cachedfile.path == jsonfile
+
+
+def test_repr(cachedfile: CachedFile[Any]) -> None:
+    assert "hits=0, misses=0" in repr(cachedfile)
+
+
+def test_first_get_loads(cachedfile: CachedFile[Any], loader: CountingLoader) -> None:
+    assert cachedfile.get() == {"a": 1}
+    assert loader.calls == 1
+    assert (cachedfile.hits, cachedfile.misses) == (0, 1)
+
+
+def test_get_within_interval_is_hit(
+    cachedfile: CachedFile[Any], loader: CountingLoader, clock: FakeClock
+) -> None:
+    cachedfile.get()
+    clock.now = 5
+    assert cachedfile.get() == {"a": 1}
+    assert loader.calls == 1
+    assert (cachedfile.hits, cachedfile.misses) == (1, 1)
+
+
+def test_change_within_interval_not_noticed(
+    cachedfile: CachedFile[Any], jsonfile: pathlib.Path, clock: FakeClock
+) -> None:
+    cachedfile.get()
+    _rewrite(jsonfile, '{"a": 2}')
+    clock.now = 5
+    assert cachedfile.get() == {"a": 1}
+
+
+def test_unchanged_file_after_interval_is_hit(
+    cachedfile: CachedFile[Any], loader: CountingLoader, clock: FakeClock
+) -> None:
+    cachedfile.get()
+    clock.now = 10
+    cachedfile.get()
+    assert loader.calls == 1
+    assert (cachedfile.hits, cachedfile.misses) == (1, 1)
+
+
+def test_changed_file_after_interval_reloads(
+    cachedfile: CachedFile[Any],
+    jsonfile: pathlib.Path,
+    loader: CountingLoader,
+    clock: FakeClock,
+) -> None:
+    cachedfile.get()
+    _rewrite(jsonfile, '{"a": 2}')
+    clock.now = 10
+    assert cachedfile.get() == {"a": 2}
+    assert loader.calls == 2
+    assert (cachedfile.hits, cachedfile.misses) == (0, 2)
+
+
+def test_no_revalidation(jsonfile: pathlib.Path, loader: CountingLoader) -> None:
+    cachedfile: CachedFile[Any] = CachedFile(jsonfile, loader, revalidate_interval=None)
+    cachedfile.get()
+    _rewrite(jsonfile, '{"a": 2}')
+    assert cachedfile.get() == {"a": 1}
+    cachedfile.reload()
+    assert cachedfile.get() == {"a": 2}
+
+
+def test_invalidate(
+    cachedfile: CachedFile[Any], jsonfile: pathlib.Path, loader: CountingLoader
+) -> None:
+    cachedfile.get()
+    cachedfile.invalidate()
+    cachedfile.get()
+    assert loader.calls == 1
+    _rewrite(jsonfile, '{"a": 2}')
+    cachedfile.invalidate()
+    assert cachedfile.get() == {"a": 2}
+
+
+def test_reload_always_loads(
+    cachedfile: CachedFile[Any], loader: CountingLoader
+) -> None:
+    cachedfile.reload()
+    cachedfile.reload()
+    assert loader.calls == 2
+    assert cachedfile.get() == {"a": 1}
+    assert (cachedfile.hits, cachedfile.misses) == (1, 0)
+
+
+def test_version(cachedfile: CachedFile[Any], jsonfile: pathlib.Path) -> None:
+    versions = [cachedfile.version]
+    cachedfile.get()
+    versions.append(version := cachedfile.version)
+    assert versions[0] is None
+    assert version is not None
+    cachedfile.reload()
+    assert cachedfile.version == version
+    _rewrite(jsonfile, '{"a": 2}')
+    cachedfile.reload()
+    assert cachedfile.version not in (None, version)
+
+
+def test_get_versioned(cachedfile: CachedFile[Any]) -> None:
+    value, version = cachedfile.get_versioned()
+    assert value == {"a": 1}
+    assert version == cachedfile.version is not None
+
+
+def test_missing_file(
+    tmp_path: pathlib.Path, loader: CountingLoader, clock: FakeClock
+) -> None:
+    path = tmp_path / "missing.json"
+    cachedfile: CachedFile[Any] = CachedFile(path, loader, clock=clock)
+    with pytest.raises(FileNotFoundError) as excinfo:
+        cachedfile.get()
+    assert excinfo.value.filename == str(path)
+    assert cachedfile.version is None
+    assert loader.calls == 0
+
+    with pytest.raises(FileNotFoundError):
+        cachedfile.get()
+    assert (cachedfile.hits, cachedfile.misses) == (1, 1)
+
+
+def test_file_appears(
+    tmp_path: pathlib.Path, loader: CountingLoader, clock: FakeClock
+) -> None:
+    path = tmp_path / "late.json"
+    cachedfile: CachedFile[Any] = CachedFile(path, loader, clock=clock)
+    with pytest.raises(FileNotFoundError):
+        cachedfile.get()
+    path.write_text('{"b": 2}')
+    clock.now = 1
+    assert cachedfile.get() == {"b": 2}
+
+
+def test_file_disappears(
+    cachedfile: CachedFile[Any], jsonfile: pathlib.Path, clock: FakeClock
+) -> None:
+    cachedfile.get()
+    jsonfile.unlink()
+    clock.now = 10
+    with pytest.raises(FileNotFoundError):
+        cachedfile.get()
+    assert cachedfile.version is None
+
+
+def test_invalid_content(
+    cachedfile: CachedFile[Any],
+    jsonfile: pathlib.Path,
+    loader: CountingLoader,
+    clock: FakeClock,
+) -> None:
+    _rewrite(jsonfile, "{invalid")
+    with pytest.raises(ValueError):
+        cachedfile.get()
+    assert cachedfile.version is None
+
+    clock.now = 5
+    with pytest.raises(ValueError):
+        cachedfile.get()
+    assert loader.calls == 1
+
+    _rewrite(jsonfile, '{"a": 3}')
+    clock.now = 10
+    assert cachedfile.get() == {"a": 3}
+
+
+def test_file_vanishes_between_stat_and_open(
+    cachedfile: CachedFile[Any],
+    jsonfile: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(cachedfile, "_stat", lambda: (1, 1))
+    jsonfile.unlink()
+    with pytest.raises(FileNotFoundError):
+        cachedfile.get()
+
+
+@pytest.fixture
+def lrucache() -> LRUCache[str, int]:
+    return LRUCache(maxsize=2)
+
+
+def test_lru_invalid_size() -> None:
+    with pytest.raises(ValueError, match="must be positive"):
+        LRUCache(maxsize=0)
+
+
+def test_lru_maxsize(lrucache: LRUCache[str, int]) -> None:
+    assert lrucache.maxsize == 2
+
+
+def test_lru_repr(lrucache: LRUCache[str, int]) -> None:
+    assert repr(lrucache) == "LRUCache(0/2, hit_ratio=0.00)"
+
+
+def test_lru_miss(lrucache: LRUCache[str, int]) -> None:
+    assert lrucache.get("a") is None
+    assert (lrucache.hits, lrucache.misses) == (0, 1)
+
+
+def test_lru_hit(lrucache: LRUCache[str, int]) -> None:
+    lrucache.put("a", 1)
+    assert "a" in lrucache
+    assert lrucache.get("a") == 1
+    assert (lrucache.hits, lrucache.misses) == (1, 0)
+
+
+def test_lru_hit_ratio(lrucache: LRUCache[str, int]) -> None:
+    assert lrucache.hit_ratio == 0.0
+    lrucache.put("a", 1)
+    lrucache.get("a")
+    lrucache.get("a")
+    lrucache.get("a")
+    lrucache.get("b")
+    assert lrucache.hit_ratio == 0.75
+
+
+def test_lru_evicts_least_recently_used(lrucache: LRUCache[str, int]) -> None:
+    lrucache.put("a", 1)
+    lrucache.put("b", 2)
+    lrucache.get("a")
+    lrucache.put("c", 3)
+    assert len(lrucache) == 2
+    assert "b" not in lrucache
+    assert lrucache.get("a") == 1
+    assert lrucache.get("c") == 3
+    assert lrucache.evictions == 1
+
+
+def test_lru_put_replaces(lrucache: LRUCache[str, int]) -> None:
+    lrucache.put("a", 1)
+    lrucache.put("a", 2)
+    assert len(lrucache) == 1
+    assert lrucache.get("a") == 2
+
+
+def test_lru_clear(lrucache: LRUCache[str, int]) -> None:
+    lrucache.put("a", 1)
+    lrucache.clear()
+    assert len(lrucache) == 0
+    assert lrucache.get("a") is None
+
+
+def test_lru_resize_grows(lrucache: LRUCache[str, int]) -> None:
+    lrucache.resize(3)
+    lrucache.replace([("a", 1), ("b", 2), ("c", 3)])
+    assert lrucache.maxsize == 3
+    assert len(lrucache) == 3
+
+
+def test_lru_resize_shrinks(lrucache: LRUCache[str, int]) -> None:
+    lrucache.put("a", 1)
+    lrucache.put("b", 2)
+    lrucache.resize(1)
+    assert lrucache.items() == [("b", 2)]
+    assert lrucache.evictions == 1
+
+
+def test_lru_resize_invalid(lrucache: LRUCache[str, int]) -> None:
+    with pytest.raises(ValueError, match="positive"):
+        lrucache.resize(0)
+
+
+def test_lru_replace(lrucache: LRUCache[str, int]) -> None:
+    lrucache.put("a", 1)
+    lrucache.replace([("b", 2), ("c", 3)])
+    assert lrucache.items() == [("b", 2), ("c", 3)]
+
+
+def test_lru_replace_too_many(lrucache: LRUCache[str, int]) -> None:
+    lrucache.replace([("a", 1), ("b", 2), ("c", 3)])
+    assert lrucache.items() == [("b", 2), ("c", 3)]
+    assert lrucache.evictions == 1
+
+
+def test_lru_items_order(lrucache: LRUCache[str, int]) -> None:
+    lrucache.put("a", 1)
+    lrucache.put("b", 2)
+    lrucache.get("a")
+    assert lrucache.items() == [("b", 2), ("a", 1)]
+
+
+class SlowComputation:
+    def __init__(self, result: int = 42) -> None:
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.result = result
+
+    async def __call__(self) -> int:
+        self.calls += 1
+        await self.release.wait()
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_singleflight_coalesces() -> None:
+    sf: SingleFlight[str, int] = SingleFlight()
+    comp = SlowComputation()
+    tasks = [asyncio.create_task(sf.run("k", comp)) for _ in range(5)]
+    await asyncio.sleep(0)
+    assert len(sf) == 1
+    comp.release.set()
+    assert await asyncio.gather(*tasks) == [42] * 5
+    assert comp.calls == 1
+    assert (sf.calls, sf.coalesced) == (5, 4)
+    assert len(sf) == 0
+
+
+@pytest.mark.asyncio
+async def test_singleflight_distinct_keys() -> None:
+    sf: SingleFlight[str, int] = SingleFlight()
+    comp1, comp2 = SlowComputation(1), SlowComputation(2)
+    t1 = asyncio.create_task(sf.run("a", comp1))
+    t2 = asyncio.create_task(sf.run("b", comp2))
+    comp1.release.set()
+    comp2.release.set()
+    assert (await t1, await t2) == (1, 2)
+    assert sf.coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_singleflight_runs_again_after_completion() -> None:
+    sf: SingleFlight[str, int] = SingleFlight()
+    comp = SlowComputation()
+    comp.release.set()
+    await sf.run("k", comp)
+    await sf.run("k", comp)
+    assert comp.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_singleflight_exception_shared() -> None:
+    sf: SingleFlight[str, int] = SingleFlight()
+    release = asyncio.Event()
+
+    async def fail() -> int:
+        await release.wait()
+        raise ValueError("boom")
+
+    tasks = [asyncio.create_task(sf.run("k", fail)) for _ in range(2)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+    assert len(sf) == 0
+
+
+@pytest.mark.asyncio
+async def test_singleflight_cancelled_caller_does_not_cancel_others() -> None:
+    sf: SingleFlight[str, int] = SingleFlight()
+    comp = SlowComputation()
+    first = asyncio.create_task(sf.run("k", comp))
+    second = asyncio.create_task(sf.run("k", comp))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.gather(first, return_exceptions=True)
+    comp.release.set()
+    assert await second == 42
+    assert comp.calls == 1
@@ -0,0 +1,88 @@
+import pytest
+
+from tptools import Tournament
+from tptools.court import Court
+from tptools.delta import TournamentDelta
+from tptools.entry import Entry
+from tptools.match import Match
+
+
+def test_delta_identical(tournament1: Tournament) -> None:
+    delta = TournamentDelta.between(tournament1, tournament1)
+    assert delta.empty
+    assert delta.base == delta.version == tournament1.version
+
+
+def test_delta_added_match(tournament2: Tournament, match2: Match) -> None:
+    new = Tournament.from_tournament(tournament2)
+    new.add_match(match2)
+    delta = TournamentDelta.between(tournament2, new)
+    assert list(delta.collections) == ["matches"]
+    assert list(delta.collections["matches"].upsert) == [match2.id]
+    assert delta.collections["matches"].remove == []
+
+
+def test_delta_removed_match(tournament2: Tournament, match2: Match) -> None:
+    new = Tournament.from_tournament(tournament2)
+    new.add_match(match2)
+    delta = TournamentDelta.between(new, tournament2)
+    assert list(delta.collections) == ["matches"]
+    assert delta.collections["matches"].upsert == {}
+    assert delta.collections["matches"].remove == [match2.id]
+
+
+def test_delta_name_change(tournament2: Tournament) -> None:
+    new = Tournament.from_tournament(tournament2)
+    new.name = "Renamed"
+    new._version = None
+    delta = TournamentDelta.between(tournament2, new)
+    assert delta.attrs == {"name": "Renamed"}
+    assert delta.collections == {}
+
+
+def test_delta_str(tournament2: Tournament, court1: Court) -> None:
+    new = Tournament.from_tournament(tournament2)
+    new.add_court(court1)
+    delta = TournamentDelta.between(tournament2, new)
+    assert str(delta).endswith("(courts +1/-0)")
+
+
+def test_delta_str_empty(tournament2: Tournament) -> None:
+    delta = TournamentDelta.between(tournament2, tournament2)
+    assert str(delta).endswith("(no changes)")
+
+
+def test_delta_apply(
+    tournament2: Tournament, match2: Match, entry12: Entry, court1: Court
+) -> None:
+    new = Tournament.from_tournament(tournament2)
+    new.add_match(match2)
+    new.add_entry(entry12)
+    new.add_court(court1)
+    delta = TournamentDelta.between(tournament2, new)
+    applied = delta.apply(tournament2)
+    assert applied == new
+    assert applied.version == new.version
+
+
+def test_delta_apply_removal(tournament2: Tournament, match2: Match) -> None:
+    new = Tournament.from_tournament(tournament2)
+    new.add_match(match2)
+    delta = TournamentDelta.between(new, tournament2)
+    assert delta.apply(new) == tournament2
+
+
+def test_delta_apply_wrong_base(
+    tournament1: Tournament, tournament2: Tournament
+) -> None:
+    delta = TournamentDelta.between(tournament2, tournament1)
+    with pytest.raises(ValueError, match="applies to version"):
+        _ = delta.apply(tournament1)
+
+
+def test_delta_roundtrip_json(tournament2: Tournament, match2: Match) -> None:
+    new = Tournament.from_tournament(tournament2)
+    new.add_match(match2)
+    delta = TournamentDelta.between(tournament2, new)
+    received = TournamentDelta.model_validate_json(delta.model_dump_json())
+    assert received.apply(tournament2) == new
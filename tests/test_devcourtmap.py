@@ -1,9 +1,11 @@
+import ipaddress
 from io import BytesIO
 
 import pytest
+from pytest_mock import MockerFixture
 
 from tptools.court import Court
-from tptools.devcourtmap import DeviceCourtMap
+from tptools.devcourtmap import DeviceCourtMap, PrefixTrie
 
 
 @pytest.fixture
@@ -91,3 +93,132 @@ def test_find_abnormal_court_name(
     devcourtmap: DeviceCourtMap, courts: dict[str, Court]
 ) -> None:
     assert devcourtmap.find_court_for_ip("192.0.2.99", courts.values()) is None
+
+
+def test_find_court_reuses_index(
+    devcourtmap: DeviceCourtMap,
+    courts: dict[str, Court],
+    mocker: MockerFixture,
+) -> None:
+    spy = mocker.spy(devcourtmap, "_build_index")
+    for ip in ("192.0.2.1", "192.0.2.2", "192.0.2.11"):
+        devcourtmap.find_court_for_ip(ip, courts.values(), courts_version="v1")
+    spy.assert_called_once()
+
+
+def test_find_court_rebuilds_index_for_new_version(
+    devcourtmap: DeviceCourtMap, courts: dict[str, Court]
+) -> None:
+    assert devcourtmap.find_court_for_ip(
+        "192.0.2.1", courts.values(), courts_version="v1"
+    ) == courts.get("court1")
+    assert devcourtmap.find_court_for_ip("192.0.2.1", [], courts_version="v2") is None
+
+
+def test_find_court_without_version_keys_on_courts(
+    devcourtmap: DeviceCourtMap, courts: dict[str, Court]
+) -> None:
+    assert devcourtmap.find_court_for_ip("192.0.2.1", courts.values()) == courts.get(
+        "court1"
+    )
+    del courts["court1"]
+    assert devcourtmap.find_court_for_ip("192.0.2.1", courts.values()) is None
+
+
+@pytest.fixture
+def prefixtrie() -> PrefixTrie[str]:
+    trie: PrefixTrie[str] = PrefixTrie()
+    for net, value in (
+        ("192.0.2.0/24", "net24"),
+        ("192.0.2.128/25", "net25"),
+        ("192.0.2.200/32", "host"),
+        ("2001:db8::/32", "net6"),
+    ):
+        trie.insert(ipaddress.ip_network(net), value)
+    return trie
+
+
+@pytest.mark.parametrize(
+    "ip, exp",
+    [
+        ("192.0.2.1", "net24"),
+        ("192.0.2.129", "net25"),
+        ("192.0.2.200", "host"),
+        ("192.0.3.1", None),
+        ("2001:db8::1", "net6"),
+        ("2001:db9::1", None),
+    ],
+)
+def test_prefixtrie_lookup(
+    prefixtrie: PrefixTrie[str], ip: str, exp: str | None
+) -> None:
+    assert prefixtrie.lookup(ipaddress.ip_address(ip)) == exp
+
+
+def test_prefixtrie_len(prefixtrie: PrefixTrie[str]) -> None:
+    assert len(prefixtrie) == 4
+    prefixtrie.insert(ipaddress.ip_network("192.0.2.0/24"), "replaced")
+    assert len(prefixtrie) == 4
+    assert prefixtrie.lookup(ipaddress.ip_address("192.0.2.1")) == "replaced"
+
+
+def test_prefixtrie_default_route() -> None:
+    trie: PrefixTrie[str] = PrefixTrie()
+    trie.insert(ipaddress.ip_network("0.0.0.0/0"), "default")
+    assert trie.lookup(ipaddress.ip_address("198.51.100.1")) == "default"
+    assert trie.lookup(ipaddress.ip_address("::1")) is None
+
+
+@pytest.fixture
+def cidrdevcourtmap() -> DeviceCourtMap:
+    toml = b"""
+    192.0.2.1 = "C1"
+    "192.0.2.0/24" = "C07"
+    "192.0.2.16/28" = 10
+    "2001:db8::/32" = "C11"
+    """
+    return DeviceCourtMap(BytesIO(toml))
+
+
+@pytest.mark.parametrize(
+    "ip, text",
+    [
+        ("192.0.2.1", "C1"),
+        ("192.0.2.2", "C07"),
+        ("192.0.2.17", "10"),
+        ("192.0.3.1", None),
+        ("2001:db8::42", "C11"),
+        ("::ffff:192.0.2.2", "C07"),
+        ("testclient", None),
+    ],
+)
+def test_find_match_in_subnet(
+    cidrdevcourtmap: DeviceCourtMap, ip: str, text: str | None
+) -> None:
+    assert cidrdevcourtmap.find_match_for_ip(ip) == text
+
+
+@pytest.mark.parametrize(
+    "ip, court",
+    [
+        ("192.0.2.1", "court1"),
+        ("192.0.2.2", "court2"),
+        ("192.0.2.17", "court10"),
+        ("2001:db8::42", "court11"),
+        ("192.0.3.1", None),
+    ],
+)
+def test_find_court_in_subnet(
+    cidrdevcourtmap: DeviceCourtMap,
+    ip: str,
+    court: str | None,
+    courts: dict[str, Court],
+) -> None:
+    assert cidrdevcourtmap.find_court_for_ip(ip, courts.values()) == (
+        courts[court] if court else None
+    )
+
+
+def test_invalid_subnet() -> None:
+    with pytest.raises(ValueError, match="Invalid network"):
+        DeviceCourtMap(BytesIO(b'"192.0.2.0/33" = "C1"'))
@@ -1,5 +1,8 @@
+from pytest_mock import MockerFixture
+
 from tptools import Entry
-from tptools.entry import Player
+from tptools.entry import Player, clear_name_cache
+from tptools.namepolicy import PlayerNamePolicy
 
 
 def test_repr(entry1: Entry) -> None:
@@ -50,3 +53,52 @@ def test_cmp_ge(entry1: Entry, entry1copy: Entry, entry2: Entry) -> None:
 
 def test_player_no_lastname(player1: Player) -> None:
     assert player1.model_copy(update={"lastname": None}).name == player1.firstname
+
+
+def test_player_name_cached(entry1: Entry, mocker: MockerFixture) -> None:
+    clear_name_cache()
+    policy = PlayerNamePolicy(lnamefirst=True)
+    spy = mocker.spy(PlayerNamePolicy, "__call__")
+    assert entry1.get_player_name(policy) == entry1.get_player_name(policy)
+    spy.assert_called_once()
+
+
+def test_player_name_not_cached_for_other_policies(
+    entry1: Entry, mocker: MockerFixture
+) -> None:
+    clear_name_cache()
+    policy = mocker.Mock(return_value="Mocked")
+    assert entry1.get_player_name(policy) == entry1.get_player_name(policy)
+    assert policy.call_count == 2
+
+
+def test_player_name_cached_per_policy(entry1: Entry) -> None:
+    clear_name_cache()
+    assert entry1.get_player_name(PlayerNamePolicy()) == "Martin Krafft"
+    assert entry1.get_player_name(PlayerNamePolicy(lnamefirst=True)) == (
+        "Krafft Martin"
+    )
+
+
+def test_player_name_cache_follows_content(entry1: Entry) -> None:
+    clear_name_cache()
+    assert entry1.get_player_name() == "Martin Krafft"
+    renamed = entry1.model_copy(deep=True)
+    renamed.player1.firstname = "Marty"
+    assert renamed.get_player_name() == "Marty Krafft"
+
+
+def test_player_name_cache_cleared(entry1: Entry, mocker: MockerFixture) -> None:
+    policy = PlayerNamePolicy()
+    _ = entry1.get_player_name(policy)
+    clear_name_cache()
+    spy = mocker.spy(PlayerNamePolicy, "__call__")
+    _ = entry1.get_player_name(policy)
+    spy.assert_called_once()
+
+
+def test_player_export_struct_cached_copy(entry1: Entry) -> None:
+    clear_name_cache()
+    struct = entry1.make_player_export_struct()
+    struct["name"] = "modified"
+    assert entry1.make_player_export_struct()["name"] == "Martin Krafft"
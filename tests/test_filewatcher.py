@@ -213,3 +213,309 @@ async def test_reactor_task(watcher_with_mocked_handler: FileWatcher) -> None:
 
     await sync.wait()
     assert task.cancelling()
+
+
+@pytest.mark.asyncio
+async def test_callbacks_run_concurrently(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    first_started = asyncio.Event()
+    second_done = asyncio.Event()
+
+    async def first() -> StateType:
+        first_started.set()
+        await second_done.wait()
+        return MappingProxyType({})
+
+    async def second() -> StateType:
+        await first_started.wait()
+        second_done.set()
+        return MappingProxyType({})
+
+    watcher_with_mocked_handler.register_callback(first)
+    watcher_with_mocked_handler.register_callback(second)
+    async with asyncio.timeout(1):
+        await watcher_with_mocked_handler._invoke_callbacks()
+
+
+@pytest.mark.asyncio
+async def test_state_merged_in_registration_order(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    async def slow() -> StateType:
+        await asyncio.sleep(0.01)
+        return MappingProxyType({"foo": "slow", "bar": "slow"})
+
+    async def fast() -> StateType:
+        return MappingProxyType({"foo": "fast"})
+
+    watcher_with_mocked_handler.register_callback(slow)
+    watcher_with_mocked_handler.register_callback(fast)
+    await watcher_with_mocked_handler._invoke_callbacks()
+    assert watcher_with_mocked_handler.state == {"foo": "fast", "bar": "slow"}
+
+
+@pytest.mark.asyncio
+async def test_callback_timeout(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    async def hangs() -> StateType:
+        await asyncio.Event().wait()
+        return MappingProxyType({"foo": "hangs"})
+
+    async def works() -> StateType:
+        return MappingProxyType({"bar": "works"})
+
+    watcher_with_mocked_handler.register_callback(hangs, timeout=0.01)
+    watcher_with_mocked_handler.register_callback(works)
+    await watcher_with_mocked_handler._invoke_callbacks()
+    assert watcher_with_mocked_handler.state == {"bar": "works"}
+
+    stats = watcher_with_mocked_handler.callback_stats
+    assert stats[hangs].timeouts == 1
+    assert stats[works].timeouts == 0
+
+
+@pytest.mark.asyncio
+async def test_callback_stats(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    async def callback() -> StateType:
+        await asyncio.sleep(0.01)
+        return MappingProxyType({})
+
+    watcher_with_mocked_handler.register_callback(callback)
+    await watcher_with_mocked_handler._invoke_callbacks()
+    await watcher_with_mocked_handler._invoke_callbacks()
+
+    stats = watcher_with_mocked_handler.callback_stats[callback]
+    assert stats.calls == 2
+    assert stats.last_duration >= 0.01
+    assert stats.max_duration >= stats.last_duration
+
+
+@pytest.mark.asyncio
+async def test_callback_stats_per_closure(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    def make_callback(delay: float) -> CallbackType:
+        async def callback() -> StateType:
+            await asyncio.sleep(delay)
+            return MappingProxyType({})
+
+        return callback
+
+    fast, slow = make_callback(0), make_callback(0.01)
+    watcher_with_mocked_handler.register_callback(fast)
+    watcher_with_mocked_handler.register_callback(slow)
+    await watcher_with_mocked_handler._invoke_callbacks()
+
+    stats = watcher_with_mocked_handler.callback_stats
+    assert stats[fast] is not stats[slow]
+    assert stats[fast].calls == stats[slow].calls == 1
+    assert stats[slow].last_duration >= 0.01 > stats[fast].last_duration
+
+
+@pytest.mark.asyncio
+async def test_invoke_without_callbacks(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    await watcher_with_mocked_handler._invoke_callbacks()
+    assert not watcher_with_mocked_handler.callback_stats
+
+
+@pytest.mark.asyncio
+async def test_reactor_clears_event_before_callbacks(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    watcher = watcher_with_mocked_handler
+    superseded: list[bool] = []
+
+    async def callback() -> StateType:
+        superseded.append(watcher.superseded)
+        return MappingProxyType({"gen": watcher.generation})
+
+    watcher.register_callback(callback)
+    watcher.fire()
+    task = asyncio.create_task(watcher.reactor_task())
+    async with asyncio.timeout(1):
+        while "gen" not in watcher.state:
+            await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert superseded == [False]
+    assert watcher.state == {"gen": 1}
+    assert watcher.superseded_count == 0
+
+
+@pytest.mark.asyncio
+async def test_reload_cancelled_when_superseded(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    watcher = watcher_with_mocked_handler
+    started = asyncio.Event()
+    generations: list[int] = []
+
+    async def callback() -> StateType:
+        generations.append(watcher.generation)
+        if watcher.generation == 1:
+            started.set()
+            await asyncio.Event().wait()
+        return MappingProxyType({"gen": watcher.generation})
+
+    watcher.register_callback(callback)
+    watcher.fire()
+    task = asyncio.create_task(watcher.reactor_task())
+    await started.wait()
+    watcher.fire()
+
+    async with asyncio.timeout(1):
+        while watcher.state.get("gen") != 2:
+            await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert generations == [1, 2]
+    assert watcher.superseded_count == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_results_discarded(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    watcher = watcher_with_mocked_handler
+    generations: list[int] = []
+
+    async def callback() -> StateType:
+        generations.append(watcher.generation)
+        if watcher.generation == 1:
+            # the file changes while we are (blockingly) loading it
+            watcher.fire()
+        return MappingProxyType({f"gen{watcher.generation}": True})
+
+    watcher.register_callback(callback)
+    watcher.fire()
+    task = asyncio.create_task(watcher.reactor_task())
+
+    async with asyncio.timeout(1):
+        while len(generations) < 2 or "gen2" not in watcher.state:
+            await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert "gen1" not in watcher.state
+    assert watcher.superseded_count == 1
+
+
+@pytest.mark.asyncio
+async def test_reactor_propagates_callback_errors(
+    watcher_with_mocked_handler: FileWatcher,
+) -> None:
+    async def callback() -> StateType:
+        raise RuntimeError("pytest")
+
+    watcher_with_mocked_handler.register_callback(callback)
+    watcher_with_mocked_handler.fire()
+    with pytest.raises(ExceptionGroup):
+        await watcher_with_mocked_handler.reactor_task()
+
+
+@pytest.fixture
+def otherpath(path: pathlib.Path) -> pathlib.Path:
+    return path.parent / "other"
+
+
+def test_add_path(
+    watcher_with_mocked_handler: FileWatcher,
+    path: pathlib.Path,
+    otherpath: pathlib.Path,
+) -> None:
+    watch = watcher_with_mocked_handler.add_path(otherpath)
+    assert watcher_with_mocked_handler.add_path(otherpath) is watch
+    assert watcher_with_mocked_handler.paths == [path, otherpath]
+
+
+def test_register_callback_for_unknown_path(
+    watcher_with_mocked_handler: FileWatcher,
+    otherpath: pathlib.Path,
+    mocker: MockerFixture,
+) -> None:
+    with pytest.raises(ValueError, match="not watching"):
+        watcher_with_mocked_handler.register_callback(
+            mocker.stub("callback"), path=otherpath
+        )
+
+
+@pytest.mark.asyncio
+async def test_per_path_callbacks(
+    watcher_with_mocked_handler: FileWatcher,
+    otherpath: pathlib.Path,
+) -> None:
+    watcher = watcher_with_mocked_handler
+    watcher.add_path(otherpath)
+
+    async def main() -> StateType:
+        return MappingProxyType({"main": watcher.generation})
+
+    async def other() -> StateType:
+        return MappingProxyType({"other": True})
+
+    watcher.register_callback(main)
+    watcher.register_callback(other, path=otherpath)
+    assert watcher.callbacks == {main, other}
+
+    task = asyncio.create_task(watcher.reactor_task())
+    watcher.fire(otherpath)
+    async with asyncio.timeout(1):
+        while "other" not in watcher.state:
+            await asyncio.sleep(0.01)
+    assert "main" not in watcher.state
+
+    watcher.fire()
+    async with asyncio.timeout(1):
+        while "main" not in watcher.state:
+            await asyncio.sleep(0.01)
+    task.cancel()
+
+    assert watcher.state == {"main": 1, "other": True}
+    assert watcher.superseded_count == 0
+
+
+def test_fire_once_asap_fires_all_paths(
+    watcher_with_mocked_handler: FileWatcher,
+    otherpath: pathlib.Path,
+    monkeypatch: MonkeyPatch,
+) -> None:
+    watch = watcher_with_mocked_handler.add_path(otherpath)
+    monkeypatch.setattr(watcher_with_mocked_handler, "_fire_once_asap", True)
+    watcher_with_mocked_handler()
+    assert watcher_with_mocked_handler.superseded
+    assert watch.superseded
+
+
+def test_handler_sets_event_on_created(
+    handler: ThreadingEventOnModifiedHandler,
+    fakeevent: FileSystemEvent,
+) -> None:
+    handler.on_created(fakeevent)
+    assert handler.event.is_set()
+
+
+def test_handler_sets_event_on_moved_onto_path(
+    handler: ThreadingEventOnModifiedHandler,
+    path: pathlib.Path,
+) -> None:
+    moved = FileSystemEvent(
+        src_path=str(path.parent / "tmpfile"), dest_path=str(path), is_synthetic=True
+    )
+    handler.on_moved(moved)
+    assert handler.event.is_set()
+
+
+def test_handler_ignores_moved_away_from_path(
+    handler: ThreadingEventOnModifiedHandler,
+    path: pathlib.Path,
+) -> None:
+    moved = FileSystemEvent(
+        src_path=str(path), dest_path=str(path.parent / "backup"), is_synthetic=True
+    )
+    handler.on_moved(moved)
+    assert not handler.event.is_set()
@@ -19,3 +19,27 @@ def test_extract_subset(combined_params: CombinedParams) -> None:
 def test_make_from_superset(combined_params: CombinedParams) -> None:
     pcp = PairCombinePolicyParams.make_from_parameter_superset(combined_params)
     assert pcp == PairCombinePolicyParams()
+
+
+def test_subset_key_matches_extract_subset(combined_params: CombinedParams) -> None:
+    key = PairCombinePolicyParams.subset_key(combined_params)
+    assert key == tuple(PairCombinePolicyParams.extract_subset(combined_params).items())
+
+
+def test_subset_key_is_hashable(combined_params: CombinedParams) -> None:
+    assert hash(PlayerNamePolicyParams.subset_key(combined_params)) == hash(
+        PlayerNamePolicyParams().params_key()
+    )
+
+
+def test_subset_key_from_other_model() -> None:
+    params = PlayerNamePolicyParams()
+    key = PairCombinePolicyParams.subset_key(params)
+    assert key == PairCombinePolicyParams().params_key()
+
+
+def test_params_key_differs() -> None:
+    assert (
+        PairCombinePolicyParams(teamjoinstr="/").params_key()
+        != PairCombinePolicyParams().params_key()
+    )
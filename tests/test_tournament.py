@@ -18,6 +18,7 @@ from tptools.sqlmodels import (
     TPPlayerMatch,
     TPSetting,
 )
+from tptools.tournament import MatchSelectionParams
 from tptools.tpmatch import TPMatch
 from tptools.tpmatch import TPMatchStatus as MatchStatus
 
@@ -28,6 +29,43 @@ def test_from_tournament(tournament1: Tournament) -> None:
     assert Tournament.from_tournament(tournament1) == tournament1
 
 
+def test_from_tournament_keeps_version(tournament1: Tournament) -> None:
+    assert Tournament.from_tournament(tournament1).version == tournament1.version
+
+
+def test_version_is_stable(tournament1: Tournament) -> None:
+    assert tournament1.version == tournament1.version
+
+
+def test_version_same_for_same_contents(
+    tournament1: Tournament, tournament2: Tournament
+) -> None:
+    assert Tournament().version == Tournament().version
+    assert tournament1.version != tournament2.version
+
+
+@pytest.mark.parametrize(
+    "add, obj",
+    [
+        ("add_match", "match2"),
+        ("add_matches", "match2"),
+        ("add_entry", "entry12"),
+        ("add_entries", "entry12"),
+        ("add_court", "court1"),
+        ("add_courts", "court1"),
+        ("add_draw", "draw1"),
+        ("add_draws", "draw1"),
+    ],
+)
+def test_version_changes_on_add(
+    tournament2: Tournament, add: str, obj: str, request: pytest.FixtureRequest
+) -> None:
+    version = tournament2.version
+    value = request.getfixturevalue(obj)
+    getattr(tournament2, add)([value] if add.endswith("s") else value)
+    assert tournament2.version != version
+
+
 def test_repr_empty_noname() -> None:
     assert (
         repr(Tournament()) == "Tournament(nentries=0, ndraws=0, ncourts=0, nmatches=0)"
@@ -371,3 +409,31 @@ def test_resolve_draw(tournament1: Tournament, draw1: Draw) -> None:
 
 def test_resolve_match(tournament1: Tournament, match1: Match) -> None:
     assert tournament1.resolve_match_by_id(match1.id) == match1
+
+
+def test_dump_json(tournament1: Tournament) -> None:
+    assert tournament1.dump_json() == tournament1.model_dump_json().encode()
+
+
+def test_dump_json_memoised(tournament1: Tournament) -> None:
+    assert tournament1.dump_json() is tournament1.dump_json()
+
+
+def test_dump_json_per_params(tournament1: Tournament) -> None:
+    params = MatchSelectionParams(include_played=False)
+    assert tournament1.dump_json(params) == (
+        tournament1.model_dump_json(context={"matchselectionparams": params}).encode()
+    )
+    assert tournament1.dump_json(params) != tournament1.dump_json()
+
+
+def test_dump_json_indent(tournament1: Tournament) -> None:
+    assert tournament1.dump_json(indent=2) == (
+        tournament1.model_dump_json(indent=2).encode()
+    )
+
+
+def test_dump_json_reset_on_change(tournament2: Tournament, match2: Match) -> None:
+    before = tournament2.dump_json()
+    tournament2.add_match(match2)
+    assert tournament2.dump_json() != before
@@ -9,6 +9,7 @@ from pathlib import Path
 from typing import Any, ContextManager
 
 import pytest
+from pydantic import TypeAdapter, ValidationError
 from pytest_mock import MockerFixture
 from sqlalchemy import Dialect
 
@@ -440,3 +441,33 @@ def test_scores_to_string_gamesep() -> None:
 )
 def test_flatten_dict(input: Mapping[str, Any], sep: str, exp: dict[str, Any]) -> None:
     assert util.flatten_dict(input, separator=sep) == exp
+
+
+def test_output_validated_in_tests() -> None:
+    assert not util.is_trusted_output()
+
+
+def test_validate_output_validates() -> None:
+    adapter = TypeAdapter(dict[str, int])
+    with pytest.raises(ValidationError):
+        _ = util.validate_output(adapter, {"a": "not a number"})
+
+
+def test_validate_output_trusted() -> None:
+    adapter = TypeAdapter(dict[str, int])
+    previous = util.set_trusted_output(True)
+    try:
+        data: dict[str, Any] = {"a": "not a number"}
+        assert util.validate_output(adapter, data) is data
+
+    finally:
+        util.set_trusted_output(previous)
+
+
+def test_set_trusted_output_returns_previous() -> None:
+    previous = util.set_trusted_output(True)
+    try:
+        assert util.set_trusted_output(True) is True
+
+    finally:
+        util.set_trusted_output(previous)
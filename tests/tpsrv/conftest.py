@@ -0,0 +1,67 @@
+import pathlib
+from collections.abc import Iterator
+from typing import Any
+
+import pytest
+from click_async_plugins import ITC
+from fastapi import FastAPI
+
+from tptools import Tournament
+from tptools.cache import CachedFile, LRUCache, SingleFlight
+from tptools.devcourtmap import DeviceCourtMap
+from tptools.ext.squore import SquoreTournament
+from tptools.match import Match
+from tptools.tpsrv.squoresrv import (
+    CONFIG_TOML_PATH,
+    FEED_CACHE_SIZE,
+    FEED_VARIANTS_SIZE,
+    SETTINGS_JSON_PATH,
+    CommandLineParams,
+    load_config,
+    load_settings,
+    squoreapp,
+)
+from tptools.tpsrv.tp_recv import recvapp
+from tptools.tpsrv.util import ChangeNotifier, CliContext
+
+
+@pytest.fixture
+def tournament2b(tournament2: Tournament, match2: Match) -> Tournament:
+    t = Tournament.from_tournament(tournament2)
+    t.add_match(match2)
+    return t
+
+
+@pytest.fixture
+def recv_clictx() -> Iterator[CliContext]:
+    clictx = CliContext(itc=ITC(), api=FastAPI())
+    recvapp.state.clictx = clictx
+    yield clictx
+    del recvapp.state.clictx
+
+
+@pytest.fixture
+def devmap_toml(tmp_path: pathlib.Path) -> pathlib.Path:
+    return tmp_path / "devmap.toml"
+
+
+@pytest.fixture
+def squore_state(
+    tournament2: Tournament, devmap_toml: pathlib.Path
+) -> Iterator[dict[str, Any]]:
+    # The same state as setup_for_squore provides, without the file watcher:
+    state: dict[str, Any] = {
+        "commandlineparams": CommandLineParams(),
+        "feedcache": LRUCache(maxsize=FEED_CACHE_SIZE),
+        "feedvariants": LRUCache(maxsize=FEED_VARIANTS_SIZE),
+        "feedflights": SingleFlight(),
+        "notifier": ChangeNotifier(),
+        "settings": CachedFile(SETTINGS_JSON_PATH, load_settings),
+        "config": CachedFile(CONFIG_TOML_PATH, load_config),
+        "devmap": CachedFile(devmap_toml, DeviceCourtMap),
+    }
+    squoreapp.state.squore = state
+    squoreapp.state.tournament = SquoreTournament.from_tournament(tournament2)
+    yield state
+    del squoreapp.state.squore
+    del squoreapp.state.tournament
@@ -0,0 +1,516 @@
+import asyncio
+import pathlib
+from collections.abc import Callable
+from typing import Any
+
+import httpx
+import pytest
+from click_async_plugins import ITC
+from fastapi import FastAPI
+from pytest_mock import MockerFixture
+
+from tptools import Tournament
+from tptools.delta import TournamentDelta
+from tptools.tpsrv.post import (
+    DeltaMaker,
+    Payload,
+    PostTarget,
+    TargetHealth,
+    backoff_delay,
+    make_payload,
+    post_to_targets,
+    post_tournament,
+)
+from tptools.tpsrv.tp_recv import recvapp
+from tptools.tpsrv.util import (
+    CONTENT_CODINGS,
+    CliContext,
+    PostData,
+    make_http_client,
+)
+
+URL = httpx.URL("http://example.org")
+
+type Handler = Callable[[httpx.Request], httpx.Response]
+
+
+def _payload(version: str) -> Payload:
+    return Payload(version=version, content=b'{"version":"%s"}' % version.encode())
+
+
+def _recorder(received: list[bytes]) -> Handler:
+    def handler(request: httpx.Request) -> httpx.Response:
+        received.append(request.content)
+        return httpx.Response(200, json={})
+
+    return handler
+
+
+async def _settle() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_make_payload(tournament2: Tournament) -> None:
+    payload = make_payload(tournament2, cookie=42)
+    assert payload.version == tournament2.version
+    data = PostData[Tournament].model_validate_json(payload.content)
+    assert data.cookie == 42
+    assert data.data == tournament2
+
+
+def test_make_payload_matches_postdata(tournament2: Tournament) -> None:
+    data = PostData(cookie=-1, data=tournament2)
+    payload = make_payload(tournament2, cookie=-1)
+    assert payload.content == data.model_dump_json().encode()
+
+
+@pytest.mark.asyncio
+async def test_post_to_targets_serialises_once(tournament2: Tournament) -> None:
+    async with make_http_client() as client:
+        targets = [PostTarget(URL, client), PostTarget(URL.join("/b"), client)]
+        post_to_targets(tournament2, targets, cookie=1)
+        first, second = (t._pending for t in targets)
+        assert first is not None and first is second
+
+
+@pytest.mark.asyncio
+async def test_target_posts() -> None:
+    received: list[bytes] = []
+    transport = httpx.MockTransport(_recorder(received))
+    async with make_http_client(transport=transport) as client:
+        target = PostTarget(URL, client)
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await _settle()
+        _ = task.cancel()
+
+    assert received == [_payload("a").content]
+    assert target.stats.posted == 1
+
+
+@pytest.mark.asyncio
+async def test_target_latest_wins() -> None:
+    received: list[bytes] = []
+    transport = httpx.MockTransport(_recorder(received))
+    async with make_http_client(transport=transport) as client:
+        target = PostTarget(URL, client)
+        target.submit(_payload("a"))
+        target.submit(_payload("b"))
+        task = asyncio.create_task(target.run())
+        await _settle()
+        _ = task.cancel()
+
+    assert received == [_payload("b").content]
+    assert target.stats.superseded == 1
+    assert target.stats.posted == 1
+
+
+def _refuse(request: httpx.Request) -> httpx.Response:
+    raise httpx.ConnectError("refused", request=request)
+
+
+@pytest.mark.parametrize("failures", [1, 2, 5, 100, 10000])
+def test_backoff_delay(failures: int) -> None:
+    delay = min(60.0, 2.0 ** min(failures - 1, 32))
+    assert delay / 2 <= backoff_delay(failures, initial=1, maximum=60) <= delay
+
+
+@pytest.mark.asyncio
+async def test_target_superseded_retry() -> None:
+    received: list[bytes] = []
+    record = _recorder(received)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.content == _payload("a").content:
+            return _refuse(request)
+        return record(request)
+
+    async with make_http_client(transport=httpx.MockTransport(handler)) as client:
+        target = PostTarget(URL, client, backoff=0.02)
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await _settle()
+        assert target.health.failures == 1
+        # The newer payload is posted after the backoff, instead of a retry:
+        target.submit(_payload("b"))
+        await asyncio.sleep(0.05)
+        _ = task.cancel()
+
+    assert received == [_payload("b").content]
+    assert target.stats.superseded == 1
+    assert target.stats.posted == 1
+    assert target.health.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_target_retries_until_recovered() -> None:
+    received: list[bytes] = []
+    record = _recorder(received)
+    down = True
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return _refuse(request) if down else record(request)
+
+    async with make_http_client(transport=httpx.MockTransport(handler)) as client:
+        target = PostTarget(URL, client, backoff=0.001, max_backoff=0.002)
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await asyncio.sleep(0.05)
+        assert target.health.failures > 1
+        down = False
+        await asyncio.sleep(0.05)
+        _ = task.cancel()
+
+    assert received == [_payload("a").content]
+    assert target.health.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_target_gives_up() -> None:
+    async with make_http_client(transport=httpx.MockTransport(_refuse)) as client:
+        target = PostTarget(URL, client, retries=2, backoff=0)
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await _settle()
+        _ = task.cancel()
+
+    assert target.stats.failed == 1
+    assert target.stats.posted == 0
+    assert target.health.failures == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [429, 502, 503, 504])
+async def test_target_transient_failure(status: int) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status)
+
+    async with make_http_client(transport=httpx.MockTransport(handler)) as client:
+        target = PostTarget(URL, client, retries=2, backoff=0)
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await _settle()
+        _ = task.cancel()
+
+    assert target.stats.failed == 1
+    assert target.stats.posted == 0
+    assert target.health.failures == 3
+    assert target.health.circuit_open
+
+
+@pytest.mark.asyncio
+async def test_target_spools_until_posted(tmp_path: pathlib.Path) -> None:
+    down = True
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return _refuse(request) if down else httpx.Response(200, json={})
+
+    async with make_http_client(transport=httpx.MockTransport(handler)) as client:
+        target = PostTarget(URL, client, retries=0, spool_dir=tmp_path)
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await asyncio.sleep(0.05)
+        _ = task.cancel()
+
+        (spooled,) = tmp_path.iterdir()
+        assert spooled.read_bytes() == _payload("a").content
+
+        # After a restart, the spooled payload gets posted:
+        down = False
+        target = PostTarget(URL, client, spool_dir=tmp_path)
+        task = asyncio.create_task(target.run())
+        await asyncio.sleep(0.05)
+        _ = task.cancel()
+
+    assert target.stats.posted == 1
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("status", [400, 503])
+async def test_target_keeps_spool_unless_posted(
+    tmp_path: pathlib.Path, status: int
+) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(status)
+
+    async with make_http_client(transport=httpx.MockTransport(handler)) as client:
+        target = PostTarget(URL, client, retries=0, spool_dir=tmp_path)
+        target._spool(_payload("a"))
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await _settle()
+        _ = task.cancel()
+
+    assert target.stats.failed == 1
+    assert target.stats.posted == 0
+    (spooled,) = tmp_path.iterdir()
+    assert spooled.read_bytes() == _payload("a").content
+
+
+@pytest.mark.asyncio
+async def test_target_spool_keeps_latest(tmp_path: pathlib.Path) -> None:
+    async with make_http_client(transport=httpx.MockTransport(_refuse)) as client:
+        target = PostTarget(
+            URL, client, backoff=0.01, max_backoff=0.01, spool_dir=tmp_path
+        )
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await _settle()
+        assert target.health.failures == 1
+        # The newer payload also fails, and replaces the older one in the spool:
+        target.submit(_payload("b"))
+        await asyncio.sleep(0.05)
+        _ = task.cancel()
+
+    assert target.health.failures >= 2
+    (spooled,) = tmp_path.iterdir()
+    assert spooled.read_bytes() == _payload("b").content
+    loaded = target._load_spool()
+    assert loaded == _payload("b")
+
+
+def test_health_latency_average() -> None:
+    health = TargetHealth()
+    health.record_success(1.0)
+    assert health.latency == 1.0
+    health.record_success(2.0, alpha=0.5)
+    assert health.latency == 1.5
+
+
+def test_health_circuit() -> None:
+    health = TargetHealth()
+    states = []
+    for _ in range(3):
+        states.append(health.circuit_open)
+        health.record_failure(cooldown=10)
+    states.append(health.circuit_open)
+    assert states == [False, False, False, True]
+    assert 0 < health.cooldown <= 10
+    health.record_success(0.1)
+    assert (health.circuit_open, health.cooldown) == (False, 0)
+
+
+@pytest.mark.asyncio
+async def test_target_cooldown_applies_to_new_payloads() -> None:
+    received: list[bytes] = []
+    transport = httpx.MockTransport(_recorder(received))
+    async with make_http_client(transport=transport) as client:
+        target = PostTarget(URL, client)
+        target.health.record_failure(cooldown=60)
+        task = asyncio.create_task(target.run())
+        target.submit(_payload("a"))
+        await _settle()
+        _ = task.cancel()
+
+    assert received == []
+
+
+@pytest.mark.asyncio
+async def test_hanging_target_does_not_delay_others() -> None:
+    received: list[bytes] = []
+    record = _recorder(received)
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "hanging.example.org":
+            await asyncio.sleep(60)
+        return record(request)
+
+    async with make_http_client(
+        transport=httpx.MockTransport(handler), max_connections=2
+    ) as client:
+        targets = [
+            PostTarget(httpx.URL("http://hanging.example.org"), client),
+            PostTarget(URL, client),
+        ]
+        tasks = [asyncio.create_task(target.run()) for target in targets]
+        for target in targets:
+            target.submit(_payload("a"))
+        await _settle()
+        for task in tasks:
+            _ = task.cancel()
+
+    assert received == [_payload("a").content]
+    assert targets[1].health.latency is not None
+
+
+@pytest.mark.asyncio
+async def test_delta_maker(tournament2: Tournament, tournament2b: Tournament) -> None:
+    deltas = DeltaMaker(cookie=1)
+    deltas.add(tournament2)
+    deltas.add(tournament2b)
+    payload = await deltas.get(tournament2.version, tournament2b.version)
+    assert payload is not None
+    assert payload.base == tournament2.version
+    assert payload.version == tournament2b.version
+    data = PostData[TournamentDelta].model_validate_json(payload.content)
+    assert data.cookie == 1
+    assert data.data.apply(tournament2) == tournament2b
+    assert await deltas.get(tournament2.version, tournament2b.version) is payload
+
+
+@pytest.mark.asyncio
+async def test_delta_maker_unknown_version(tournament2: Tournament) -> None:
+    deltas = DeltaMaker(cookie=1)
+    deltas.add(tournament2)
+    assert await deltas.get("unknown", tournament2.version) is None
+
+
+def _recv_client() -> httpx.AsyncClient:
+    return make_http_client(transport=httpx.ASGITransport(app=recvapp))
+
+
+async def _post_all(target: PostTarget, *tournaments: Tournament) -> None:
+    deltas = target._deltas
+    task = asyncio.create_task(target.run())
+    for tournament in tournaments:
+        post_to_targets(tournament, [target], cookie=1, deltas=deltas)
+        for _ in range(100):
+            await asyncio.sleep(0.001)
+            if target._pending is None and target.acked == tournament.version:
+                break
+    _ = task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_target_posts_delta(
+    recv_clictx: CliContext, tournament2: Tournament, tournament2b: Tournament
+) -> None:
+    async with _recv_client() as client:
+        target = PostTarget(
+            URL.join("/tournament"), client, deltas=DeltaMaker(cookie=1)
+        )
+        await _post_all(target, tournament2, tournament2b)
+
+    assert recv_clictx.itc.get("tournament") == tournament2b
+    assert target.stats.posted == 2
+    assert target.stats.deltas == 1
+    assert target.acked == tournament2b.version
+
+
+@pytest.mark.asyncio
+async def test_target_posts_in_full_if_delta_rejected(
+    recv_clictx: CliContext, tournament2: Tournament, tournament2b: Tournament
+) -> None:
+    async with _recv_client() as client:
+        target = PostTarget(
+            URL.join("/tournament"), client, deltas=DeltaMaker(cookie=1)
+        )
+        await _post_all(target, tournament2)
+        # As if the receiver restarted:
+        recv_clictx.itc.set("tournament", None)
+        await _post_all(target, tournament2b)
+
+    assert recv_clictx.itc.get("tournament") == tournament2b
+    assert target.stats.posted == 2
+    assert target.stats.deltas == 0
+
+
+@pytest.mark.asyncio
+async def test_target_without_acks_gets_no_deltas(
+    tournament2: Tournament, tournament2b: Tournament
+) -> None:
+    received: list[bytes] = []
+    transport = httpx.MockTransport(_recorder(received))
+    async with make_http_client(transport=transport) as client:
+        target = PostTarget(URL, client, deltas=DeltaMaker(cookie=1))
+        task = asyncio.create_task(target.run())
+        for tournament in (tournament2, tournament2b):
+            post_to_targets(tournament, [target], cookie=1, deltas=target._deltas)
+            await _settle()
+        _ = task.cancel()
+
+    assert target.acked is None
+    assert target.stats.deltas == 0
+    assert [PostData[Tournament].model_validate_json(r).data for r in received] == [
+        tournament2,
+        tournament2b,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_target_compresses_once_advertised(
+    recv_clictx: CliContext, tournament2: Tournament, tournament2b: Tournament
+) -> None:
+    async with _recv_client() as client:
+        target = PostTarget(URL.join("/tournament"), client)
+        await _post_all(target, tournament2)
+        assert target.coding == next(iter(CONTENT_CODINGS))
+        await _post_all(target, tournament2b)
+
+    assert recv_clictx.itc.get("tournament") == tournament2b
+
+
+@pytest.mark.asyncio
+async def test_target_without_compression(
+    recv_clictx: CliContext, tournament2: Tournament
+) -> None:
+    async with _recv_client() as client:
+        target = PostTarget(URL.join("/tournament"), client, compress=False)
+        await _post_all(target, tournament2)
+
+    assert target.coding is None
+
+
+@pytest.mark.asyncio
+async def test_target_compression_rejected(tournament2: Tournament) -> None:
+    encodings: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        encodings.append(coding := request.headers.get("Content-Encoding"))
+        if coding is not None:
+            return httpx.Response(415, json={})
+        return httpx.Response(200, json={}, headers={"Accept-Encoding": "gzip"})
+
+    async with make_http_client(transport=httpx.MockTransport(handler)) as client:
+        target = PostTarget(URL, client)
+        target._coding = "gzip"
+        task = asyncio.create_task(target.run())
+        post_to_targets(tournament2, [target], cookie=1)
+        for _ in range(100):
+            await asyncio.sleep(0.001)
+            if target.stats.posted:
+                break
+        _ = task.cancel()
+
+    assert encodings == ["gzip", None]
+    assert target.stats.posted == 1
+    # The receiver still advertises gzip, so it gets tried again next time:
+    assert target.coding == "gzip"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("compress", [True, False])
+async def test_post_tournament_compress(
+    mocker: MockerFixture,
+    tournament2: Tournament,
+    tournament2b: Tournament,
+    compress: bool,
+) -> None:
+    encodings: list[str | None] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        encodings.append(request.headers.get("Content-Encoding"))
+        return httpx.Response(200, json={}, headers={"Accept-Encoding": "gzip"})
+
+    def client(**kwargs: Any) -> httpx.AsyncClient:
+        return make_http_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    _ = mocker.patch("tptools.tpsrv.post.make_http_client", side_effect=client)
+    clictx = CliContext(itc=ITC(), api=FastAPI())
+    async with post_tournament(
+        clictx, [URL], send_deltas=False, compress=compress
+    ) as tasks:
+        assert tasks is not None
+        task = asyncio.create_task(tasks)
+        for posts, tournament in enumerate((tournament2, tournament2b), 1):
+            clictx.itc.set("tournament", tournament)
+            for _ in range(100):
+                await asyncio.sleep(0.001)
+                if len(encodings) == posts:
+                    break
+        _ = task.cancel()
+
+    # The first response advertises gzip, which only gets used if enabled:
+    assert encodings == [None, "gzip" if compress else None]
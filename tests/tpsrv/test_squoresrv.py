@@ -0,0 +1,286 @@
+import asyncio
+import json
+import pathlib
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+import httpx
+import pytest
+from click_async_plugins import ITC
+from fastapi import FastAPI
+from pytest import MonkeyPatch
+
+from tptools import Tournament
+from tptools.court import Court
+from tptools.ext.squore import SquoreTournament
+from tptools.tpsrv.squoresrv import (
+    CONFIG_TOML_PATH,
+    LONGPOLL_MAX_WAIT,
+    LONGPOLL_PARAM,
+    SETTINGS_JSON_PATH,
+    RenderedFeed,
+    setup_for_squore,
+    squoreapp,
+)
+from tptools.tpsrv.util import CliContext
+
+
+def _squore_client() -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=squoreapp)
+    return httpx.AsyncClient(transport=transport, base_url="http://t")
+
+
+@pytest.mark.asyncio
+async def test_players_without_devmap(squore_state: dict[str, Any]) -> None:
+    async with _squore_client() as client:
+        resp = await client.get("/players")
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_malformed_devmap(
+    squore_state: dict[str, Any], devmap_toml: pathlib.Path
+) -> None:
+    _ = devmap_toml.write_text("not = [valid toml")
+    async with _squore_client() as client:
+        resp = await client.get("/players")
+    assert resp.status_code == 500
+    assert str(devmap_toml) in resp.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_bundle_parts(squore_state: dict[str, Any]) -> None:
+    async with _squore_client() as client:
+        resp = await client.get("/bundle")
+        parts = {
+            part: await client.get(f"/{part}")
+            for part in ("settings", "feeds", "matches", "players")
+        }
+    assert resp.status_code == 200
+    bundle = resp.json()
+    assert bundle["settings"] == parts["settings"].json()
+    assert bundle["feeds"] == parts["feeds"].json()
+    assert bundle["matches"] == parts["matches"].json()
+    assert "\n".join(bundle["players"]) == parts["players"].text
+
+
+@pytest.mark.asyncio
+async def test_bundle_not_modified(squore_state: dict[str, Any]) -> None:
+    async with _squore_client() as client:
+        resp = await client.get("/bundle")
+        etag = resp.headers["ETag"]
+        again = await client.get("/bundle", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert not again.content
+
+
+@pytest.mark.asyncio
+async def test_etag_for_all_codings(squore_state: dict[str, Any]) -> None:
+    async with _squore_client() as client:
+        resps = [
+            await client.get("/settings", headers={"Accept-Encoding": coding})
+            for coding in ("gzip", "identity")
+        ]
+        etag = resps[0].headers["ETag"]
+        # Clients might have kept the tag without the weakness indicator:
+        again = await client.get(
+            "/settings", headers={"If-None-Match": etag.removeprefix("W/")}
+        )
+    assert [r.headers.get("Content-Encoding") for r in resps] == ["gzip", None]
+    assert etag.startswith("W/")
+    assert resps[1].headers["ETag"] == etag
+    assert again.status_code == 304
+
+
+@pytest.fixture
+def squore_files(tmp_path: pathlib.Path) -> dict[str, pathlib.Path]:
+    files = {
+        "settings_json": tmp_path / "settings.json",
+        "config_toml": tmp_path / "config.toml",
+        "devmap_toml": tmp_path / "devmap.toml",
+    }
+    _ = files["settings_json"].write_bytes(SETTINGS_JSON_PATH.read_bytes())
+    _ = files["config_toml"].write_bytes(CONFIG_TOML_PATH.read_bytes())
+    return files
+
+
+@asynccontextmanager
+async def _squore_running(
+    clictx: CliContext, **kwargs: Any
+) -> AsyncIterator[dict[str, Any]]:
+    async with setup_for_squore(clictx=clictx, **kwargs) as tasks:
+        assert tasks is not None
+        task = asyncio.create_task(tasks)
+        try:
+            yield squoreapp.state.squore
+
+        finally:
+            _ = task.cancel()
+            _ = await asyncio.gather(task, return_exceptions=True)
+            del squoreapp.state.squore
+            if hasattr(squoreapp.state, "tournament"):
+                del squoreapp.state.tournament
+
+
+def _changed_squore_file(key: str, path: pathlib.Path) -> bytes:
+    match key:
+        case "settings":
+            return json.dumps(json.loads(path.read_bytes()) | {"changed": 1}).encode()
+        case "config":
+            return path.read_bytes() + b"\n# changed\n"
+        case _:
+            return b'"192.0.2.1" = "C01"\n'
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("key", ["settings", "config", "devmap"])
+async def test_squore_file_reloaded(
+    squore_files: dict[str, pathlib.Path], key: str
+) -> None:
+    clictx = CliContext(itc=ITC(), api=FastAPI())
+    async with _squore_running(clictx, **squore_files) as state:
+        cachedfile = state[key]
+        version = cachedfile.version
+        changes = state["notifier"].changes
+        state["feedcache"].put(("feed",), RenderedFeed(body=b"{}", nummatches=0))
+        _ = cachedfile.path.write_bytes(_changed_squore_file(key, cachedfile.path))
+        state["watcher"].fire(cachedfile.path)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if cachedfile.version != version:
+                break
+
+    assert cachedfile.version != version
+    assert state["notifier"].changes > changes
+    # Only the config is part of the feeds:
+    assert (("feed",) in state["feedcache"]) is (key != "config")
+
+
+@pytest.mark.asyncio
+async def test_squore_settings_directory_missing(
+    squore_files: dict[str, pathlib.Path], tmp_path: pathlib.Path
+) -> None:
+    squore_files["settings_json"] = tmp_path / "missing" / "settings.json"
+    clictx = CliContext(itc=ITC(), api=FastAPI())
+    async with _squore_running(clictx, **squore_files) as state:
+        assert state["watcher"].paths == [
+            squore_files["config_toml"],
+            squore_files["devmap_toml"],
+        ]
+
+
+async def _publish(clictx: CliContext, tournament: Tournament) -> None:
+    clictx.itc.set("tournament", tournament)
+    for _ in range(100):
+        await asyncio.sleep(0.01)
+        current = getattr(squoreapp.state, "tournament", None)
+        if current is not None and current.version == tournament.version:
+            return
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cachesize", [None, 1])
+async def test_update_prerenders_known_feeds(
+    monkeypatch: MonkeyPatch,
+    squore_files: dict[str, pathlib.Path],
+    tournament2: Tournament,
+    tournament2b: Tournament,
+    court1: Court,
+    court2: Court,
+    cachesize: int | None,
+) -> None:
+    if cachesize is not None:
+        # Too small for all the feeds pre-rendered for the courts:
+        monkeypatch.setattr("tptools.tpsrv.squoresrv.FEED_CACHE_SIZE", cachesize)
+
+    for tournament in (tournament2, tournament2b):
+        tournament.add_court(court1)
+        tournament.add_court(court2)
+    courtparams = [{}, {"court": court1.id}, {"court": court2.id}]
+
+    clictx = CliContext(itc=ITC(), api=FastAPI())
+    async with _squore_running(clictx, **squore_files) as state:
+        await _publish(clictx, tournament2)
+        async with _squore_client() as client:
+            # Devices request their feeds, which makes the variant known:
+            _ = await client.get("/matches")
+            await _publish(clictx, tournament2b)
+            feedcache = state["feedcache"]
+            hits, misses = feedcache.hits, feedcache.misses
+            resps = [
+                await client.get("/matches", params=params) for params in courtparams
+            ]
+
+    assert all(resp.status_code == 200 for resp in resps)
+    assert (feedcache.hits, feedcache.misses) == (hits + len(courtparams), misses)
+
+
+@pytest.mark.asyncio
+async def test_longpoll_woken_by_change(
+    squore_state: dict[str, Any], tournament2b: Tournament
+) -> None:
+    async with _squore_client() as client:
+        etag = (await client.get("/matches")).headers["ETag"]
+        pending = asyncio.create_task(
+            client.get(
+                "/matches",
+                params={LONGPOLL_PARAM: 5},
+                headers={"If-None-Match": etag},
+            )
+        )
+        await asyncio.sleep(0.05)
+        assert not pending.done()
+        squoreapp.state.tournament = SquoreTournament.from_tournament(tournament2b)
+        squore_state["notifier"].notify()
+        resp = await asyncio.wait_for(pending, 1)
+
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_longpoll_times_out(squore_state: dict[str, Any]) -> None:
+    async with _squore_client() as client:
+        etag = (await client.get("/matches")).headers["ETag"]
+        resp = await client.get(
+            "/matches", params={LONGPOLL_PARAM: 0.05}, headers={"If-None-Match": etag}
+        )
+
+    assert resp.status_code == 304
+    assert resp.headers["ETag"] == etag
+
+
+@pytest.mark.asyncio
+async def test_longpoll_wait_limited(squore_state: dict[str, Any]) -> None:
+    async with _squore_client() as client:
+        resp = await client.get(
+            "/matches",
+            params={LONGPOLL_PARAM: LONGPOLL_MAX_WAIT + 1},
+            headers={"If-None-Match": '"etag"'},
+        )
+
+    assert resp.status_code == 422
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("path", ["/matches", "/players", "/feeds", "/settings"])
+async def test_if_none_match(
+    squore_state: dict[str, Any], tournament2b: Tournament, path: str
+) -> None:
+    async with _squore_client() as client:
+        resp = await client.get(path)
+        assert resp.status_code == 200
+        etag = resp.headers["ETag"]
+
+        resp = await client.get(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["ETag"] == etag
+        assert resp.content == b""
+
+        squoreapp.state.tournament = SquoreTournament.from_tournament(tournament2b)
+        resp = await client.get(path, headers={"If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["ETag"] != etag
+        assert resp.content
@@ -0,0 +1,23 @@
+import pathlib
+
+import pytest
+from click_async_plugins import ITC
+from fastapi import FastAPI
+from pytest_mock import MockerFixture
+
+from tptools.tpsrv.tp import tp_source
+from tptools.tpsrv.util import CliContext
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("load_timeout", [None, 300.0])
+async def test_tp_source_load_timeout(
+    mocker: MockerFixture, load_timeout: float | None
+) -> None:
+    watcher_cls = mocker.patch("tptools.tpsrv.tp.FileWatcher")
+    clictx = CliContext(itc=ITC(), api=FastAPI())
+    async with tp_source(
+        clictx, pathlib.Path("t.tp"), mocker.Mock(), load_timeout=load_timeout
+    ):
+        pass
+    assert watcher_cls.call_args.kwargs["callback_timeout"] == load_timeout
@@ -0,0 +1,222 @@
+import gzip
+import json
+
+import httpx
+import pytest
+
+from tptools import Tournament
+from tptools.delta import TournamentDelta
+from tptools.tpsrv.tp_recv import TournamentStream, recvapp
+from tptools.tpsrv.util import CONTENT_CODINGS, CliContext, PostData
+
+
+def _parse(event: bytes) -> dict[str, str]:
+    return dict(line.split(": ", 1) for line in event.decode().splitlines() if line)
+
+
+def test_stream_publish_first_has_no_delta(tournament2: Tournament) -> None:
+    stream = TournamentStream()
+    assert stream.publish(tournament2) is None
+    assert stream.version == tournament2.version
+    assert stream.notifier.changes == 1
+
+
+def test_stream_publish_delta(
+    tournament2: Tournament, tournament2b: Tournament
+) -> None:
+    stream = TournamentStream()
+    _ = stream.publish(tournament2)
+    delta = stream.publish(tournament2b)
+    assert delta is not None
+    assert delta.base == tournament2.version
+    assert delta.version == tournament2b.version
+
+
+def test_stream_publish_unchanged(tournament2: Tournament) -> None:
+    stream = TournamentStream()
+    _ = stream.publish(tournament2)
+    assert stream.publish(Tournament.from_tournament(tournament2)) is None
+    assert stream.notifier.changes == 1
+
+
+def test_stream_deltas_since(tournament2: Tournament, tournament2b: Tournament) -> None:
+    stream = TournamentStream()
+    assert stream.deltas_since(tournament2.version) is None
+    _ = stream.publish(tournament2)
+    _ = stream.publish(tournament2b)
+    assert stream.deltas_since(tournament2b.version) == []
+    deltas = stream.deltas_since(tournament2.version)
+    assert deltas is not None and len(deltas) == 1
+    assert stream.deltas_since("unknown") is None
+    assert stream.deltas_since(None) is None
+
+
+def test_stream_history_bounded(
+    tournament2: Tournament, tournament2b: Tournament
+) -> None:
+    stream = TournamentStream(history_size=1)
+    _ = stream.publish(tournament2)
+    _ = stream.publish(tournament2b)
+    _ = stream.publish(tournament2)
+    assert stream.deltas_since(tournament2b.version) is not None
+    assert stream.deltas_since(tournament2.version) == []
+
+
+@pytest.mark.asyncio
+async def test_stream_events_snapshot_then_delta(
+    tournament2: Tournament, tournament2b: Tournament
+) -> None:
+    stream = TournamentStream()
+    _ = stream.publish(tournament2)
+    events = stream.events()
+    snapshot = _parse(await anext(events))
+    assert snapshot["event"] == "snapshot"
+    assert snapshot["id"] == tournament2.version
+    assert json.loads(snapshot["data"])["name"] == tournament2.name
+
+    pending = anext(events)
+    _ = stream.publish(tournament2b)
+    delta = _parse(await pending)
+    assert delta["event"] == "delta"
+    assert delta["id"] == tournament2b.version
+    assert list(json.loads(delta["data"])["collections"]) == ["matches"]
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_events_resume(
+    tournament2: Tournament, tournament2b: Tournament
+) -> None:
+    stream = TournamentStream()
+    _ = stream.publish(tournament2)
+    _ = stream.publish(tournament2b)
+    events = stream.events(tournament2.version)
+    delta = _parse(await anext(events))
+    assert delta["event"] == "delta"
+    assert delta["id"] == tournament2b.version
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_events_keepalive(tournament2: Tournament) -> None:
+    stream = TournamentStream()
+    _ = stream.publish(tournament2)
+    events = stream.events(tournament2.version, keepalive=0)
+    assert await anext(events) == b": keepalive\n\n"
+    await events.aclose()
+
+
+def _recv_client() -> httpx.AsyncClient:
+    transport = httpx.ASGITransport(app=recvapp)
+    return httpx.AsyncClient(transport=transport, base_url="http://t")
+
+
+@pytest.mark.asyncio
+async def test_receive_tournament(
+    recv_clictx: CliContext, tournament2: Tournament
+) -> None:
+    data = PostData(cookie=0, data=tournament2)
+    async with _recv_client() as client:
+        resp = await client.post("/tournament", content=data.model_dump_json())
+    assert resp.status_code == 200
+    assert resp.json()["version"] == tournament2.version
+    assert recv_clictx.itc.get("tournament") == tournament2
+
+
+@pytest.mark.asyncio
+async def test_receive_own_tournament(
+    recv_clictx: CliContext, tournament2: Tournament
+) -> None:
+    data = PostData(cookie=hash(recv_clictx), data=tournament2)
+    async with _recv_client() as client:
+        resp = await client.post("/tournament", content=data.model_dump_json())
+    assert resp.status_code == 508
+
+
+@pytest.mark.asyncio
+async def test_receive_delta(
+    recv_clictx: CliContext,
+    tournament2: Tournament,
+    tournament2b: Tournament,
+) -> None:
+    recv_clictx.itc.set("tournament", tournament2)
+    data = PostData(cookie=0, data=TournamentDelta.between(tournament2, tournament2b))
+    async with _recv_client() as client:
+        resp = await client.post("/tournament/delta", content=data.model_dump_json())
+    assert resp.status_code == 200
+    assert resp.json()["version"] == tournament2b.version
+    assert recv_clictx.itc.get("tournament") == tournament2b
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("current", [None, "tournament2b"])
+async def test_receive_delta_conflict(
+    request: pytest.FixtureRequest,
+    recv_clictx: CliContext,
+    tournament2: Tournament,
+    tournament2b: Tournament,
+    current: str | None,
+) -> None:
+    if current is not None:
+        recv_clictx.itc.set("tournament", request.getfixturevalue(current))
+    data = PostData(cookie=0, data=TournamentDelta.between(tournament2, tournament2b))
+    async with _recv_client() as client:
+        resp = await client.post("/tournament/delta", content=data.model_dump_json())
+    assert resp.status_code == 409
+    assert recv_clictx.itc.get("tournament") == (
+        None if current is None else tournament2b
+    )
+
+
+@pytest.mark.asyncio
+async def test_receive_tournament_advertises_codings(
+    recv_clictx: CliContext, tournament2: Tournament
+) -> None:
+    data = PostData(cookie=0, data=tournament2)
+    async with _recv_client() as client:
+        resp = await client.post("/tournament", content=data.model_dump_json())
+    assert resp.headers["Accept-Encoding"] == ", ".join(CONTENT_CODINGS)
+
+
+@pytest.mark.asyncio
+async def test_receive_tournament_gzip(
+    recv_clictx: CliContext, tournament2: Tournament
+) -> None:
+    data = PostData(cookie=0, data=tournament2)
+    async with _recv_client() as client:
+        resp = await client.post(
+            "/tournament",
+            content=gzip.compress(data.model_dump_json().encode()),
+            headers={"Content-Encoding": "gzip"},
+        )
+    assert resp.status_code == 200
+    assert recv_clictx.itc.get("tournament") == tournament2
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("coding, status", [("br", 415), ("gzip", 400)])
+async def test_receive_tournament_bad_coding(
+    recv_clictx: CliContext, coding: str, status: int
+) -> None:
+    async with _recv_client() as client:
+        resp = await client.post(
+            "/tournament",
+            content=b"not compressed",
+            headers={"Content-Encoding": coding},
+        )
+    assert resp.status_code == status
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("coding", [None, "gzip"])
+async def test_serve_tournament(
+    recv_clictx: CliContext, tournament1: Tournament, coding: str | None
+) -> None:
+    recv_clictx.itc.set("tournament", tournament1)
+    async with _recv_client() as client:
+        resp = await client.get(
+            "/tournament", headers={"Accept-Encoding": coding or "identity"}
+        )
+    assert resp.status_code == 200
+    assert resp.headers.get("Content-Encoding") == coding
+    assert resp.content == tournament1.dump_json()
@@ -1,10 +1,24 @@
+import asyncio
 from contextlib import nullcontext
 from typing import Any, ContextManager
 
 import click
+import httpx
 import pytest
 
-from tptools.tpsrv.util import validate_urls
+from tptools.tpsrv.util import (
+    COMPRESS_MIN_SIZE,
+    CONTENT_CODINGS,
+    ChangeNotifier,
+    EncodedBody,
+    encoded_response,
+    etag_matches,
+    http_request,
+    make_etag,
+    make_http_client,
+    negotiate_content_coding,
+    validate_urls,
+)
 
 
 @pytest.fixture
@@ -32,3 +46,160 @@ def test_validate_urls(
 ) -> None:
     with res as out:
         assert [str(u) for u in validate_urls(fake_click_context, "url", (inp,))] == out
+
+
+def test_make_etag_is_weak() -> None:
+    etag = make_etag("a", 1)
+    assert etag.startswith('W/"') and etag.endswith('"')
+
+
+def test_make_etag_is_stable() -> None:
+    assert make_etag("a", 1, None) == make_etag("a", 1, None)
+
+
+@pytest.mark.parametrize("other", [("a", 2, None), ("a", 1), (("a", 1), None)])
+def test_make_etag_differs(other: tuple[Any, ...]) -> None:
+    assert make_etag("a", 1, None) != make_etag(*other)
+
+
+@pytest.mark.parametrize(
+    "header, exp",
+    [
+        (None, False),
+        ('"abc"', True),
+        ('"def"', False),
+        ("*", True),
+        ('"def", "abc"', True),
+        ('"def","ghi"', False),
+        ('W/"abc"', True),
+    ],
+)
+@pytest.mark.parametrize("etag", ['"abc"', 'W/"abc"'])
+def test_etag_matches(header: str | None, exp: bool, etag: str) -> None:
+    assert etag_matches(header, etag) is exp
+
+
+@pytest.mark.asyncio
+async def test_change_notifier_wakes_waiters() -> None:
+    notifier = ChangeNotifier()
+    event = notifier.event
+    waiters = [asyncio.create_task(notifier.wait(event, 1)) for _ in range(3)]
+    await asyncio.sleep(0)
+    notifier.notify()
+    assert await asyncio.gather(*waiters) == [True] * 3
+    assert notifier.changes == 1
+
+
+@pytest.mark.asyncio
+async def test_change_notifier_replaces_event() -> None:
+    notifier = ChangeNotifier()
+    event = notifier.event
+    notifier.notify()
+    assert event.is_set()
+    assert notifier.event is not event
+    assert not notifier.event.is_set()
+
+
+@pytest.mark.asyncio
+async def test_change_notifier_change_before_wait_not_missed() -> None:
+    notifier = ChangeNotifier()
+    event = notifier.event
+    notifier.notify()
+    assert await notifier.wait(event, 0)
+
+
+@pytest.mark.asyncio
+async def test_change_notifier_timeout() -> None:
+    notifier = ChangeNotifier()
+    assert not await notifier.wait(notifier.event, 0.01)
+
+
+def _echo(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, json={"received": len(request.content)})
+
+
+def test_make_http_client() -> None:
+    client = make_http_client(timeout=2.5)
+    assert client.timeout == httpx.Timeout(2.5)
+
+
+@pytest.mark.asyncio
+async def test_http_request_with_client() -> None:
+    async with make_http_client(transport=httpx.MockTransport(_echo)) as client:
+        resp = await http_request(
+            "POST", httpx.URL("http://example.org"), client=client, content=b"{}"
+        )
+        assert resp == {"received": 2}
+        assert not client.is_closed
+
+
+@pytest.mark.asyncio
+async def test_http_request_retries_then_gives_up() -> None:
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        raise httpx.ConnectError("refused", request=request)
+
+    async with make_http_client(transport=httpx.MockTransport(handler)) as client:
+        resp = await http_request(
+            "GET", httpx.URL("http://example.org"), client=client, retries=2, sleep=0
+        )
+    assert resp is None
+    assert calls == 3
+
+
+@pytest.mark.parametrize(
+    "header, exp",
+    [
+        (None, None),
+        ("", None),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "gzip"),
+        ("GZIP;q=0.5", "gzip"),
+        ("gzip;q=0", None),
+        ("gzip;q=nonsense", None),
+        ("deflate", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", None),
+        ("identity", None),
+    ],
+)
+def test_negotiate_content_coding(header: str | None, exp: str | None) -> None:
+    assert negotiate_content_coding(header, ["gzip"]) == exp
+
+
+@pytest.mark.parametrize("coding", CONTENT_CODINGS)
+def test_encoded_body_roundtrip(coding: str) -> None:
+    body = EncodedBody(b"tptools" * 1000)
+    encoded = body.encode(coding)
+    assert len(encoded) < len(body)
+    assert CONTENT_CODINGS[coding][1](encoded) == body.data
+    assert body.encode(coding) is encoded
+
+
+def test_encoded_body_identity() -> None:
+    body = EncodedBody(b"data")
+    assert body.encode(None) is body.data
+
+
+def test_encoded_response_compressed() -> None:
+    body = EncodedBody(b"x" * COMPRESS_MIN_SIZE)
+    resp = encoded_response(
+        body, "gzip", media_type="text/plain", headers={"ETag": '"e"'}
+    )
+    assert resp.body == body.encode("gzip")
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert resp.headers["Vary"] == "Accept-Encoding"
+    assert resp.headers["ETag"] == '"e"'
+
+
+@pytest.mark.parametrize(
+    "size, header", [(COMPRESS_MIN_SIZE - 1, "gzip"), (10000, None)]
+)
+def test_encoded_response_uncompressed(size: int, header: str | None) -> None:
+    body = EncodedBody(b"x" * size)
+    resp = encoded_response(body, header, media_type="text/plain")
+    assert resp.body == body.data
+    assert "Content-Encoding" not in resp.headers
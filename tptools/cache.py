@@ -0,0 +1,287 @@
+import asyncio
+import errno
+import hashlib
+import io
+import logging
+import os
+import pathlib
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from typing import IO, Never
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REVALIDATE_INTERVAL = 1.0
+DEFAULT_LRU_CACHE_SIZE = 128
+
+type FileSignature = tuple[int, int]
+
+
+class CachedFile[T]:
+    def __init__(
+        self,
+        path: pathlib.Path,
+        loader: Callable[[IO[bytes]], T],
+        *,
+        revalidate_interval: float | None = DEFAULT_REVALIDATE_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._path = path
+        self._loader = loader
+        self._revalidate_interval = revalidate_interval
+        self._clock = clock
+        self._checked_at: float | None = None
+        self._signature: FileSignature | None = None
+        self._value: T | None = None
+        self._error: Exception | None = None
+        self._version: str | None = None
+        self._hits = 0
+        self._misses = 0
+        # FastAPI runs synchronous dependencies in worker threads:
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({self._path}, "
+            f"hits={self._hits}, misses={self._misses})"
+        )
+
+    @property
+    def path(self) -> pathlib.Path:
+        return self._path
+
+    @property
+    def version(self) -> str | None:
+        return self._version
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def _stat(self) -> FileSignature | None:
+        try:
+            st = os.stat(self._path)
+            return st.st_mtime_ns, st.st_size
+
+        except FileNotFoundError:
+            return None
+
+    def _load(self, signature: FileSignature | None) -> None:
+        self._signature = signature
+        self._value = None
+        self._error = None
+        self._version = None
+
+        try:
+            with open(self._path, "rb") as f:
+                data = f.read()
+
+        except FileNotFoundError as err:
+            self._error = err
+            logger.debug(f"File {self._path} does not exist")
+            return
+
+        try:
+            self._value = self._loader(io.BytesIO(data))
+
+        except ValueError as err:
+            self._error = err
+            logger.warning(f"Cannot load {self._path}: {err}")
+
+        else:
+            self._version = hashlib.blake2b(data, digest_size=8).hexdigest()
+            logger.info(f"Loaded {self._path} (version {self._version})")
+
+    def _revalidate(self, *, force: bool = False) -> bool:
+        now = self._clock()
+        if not force and self._checked_at is not None:
+            if self._revalidate_interval is None or (
+                now - self._checked_at < self._revalidate_interval
+            ):
+                return False
+
+        self._checked_at = now
+        signature = self._stat()
+        if force or signature is None or signature != self._signature:
+            self._load(signature)
+            return True
+
+        return False
+
+    def reload(self) -> None:
+        with self._lock:
+            self._revalidate(force=True)
+
+    def invalidate(self) -> None:
+        self._checked_at = None
+
+    def get_versioned(self) -> tuple[T, str | None] | Never:
+        # The value with the version it was loaded at, which cannot be had
+        # race-free from separate calls to get() and version:
+        with self._lock:
+            if self._revalidate():
+                self._misses += 1
+            else:
+                self._hits += 1
+            value, error, version = self._value, self._error, self._version
+
+        if error is not None:
+            if isinstance(error, FileNotFoundError):
+                # Raise a new exception every time, rather than the stored one,
+                # whose traceback would otherwise keep growing:
+                raise FileNotFoundError(
+                    errno.ENOENT, os.strerror(errno.ENOENT), str(self._path)
+                )
+            raise error.with_traceback(None)
+
+        return value, version  # type: ignore[return-value]
+
+    def get(self) -> T | Never:
+        return self.get_versioned()[0]
+
+
+class LRUCache[K: Hashable, V]:
+    def __init__(self, maxsize: int = DEFAULT_LRU_CACHE_SIZE) -> None:
+        if maxsize < 1:
+            raise ValueError(f"LRUCache size must be positive, not {maxsize}")
+        self._maxsize = maxsize
+        self._data: OrderedDict[K, V] = OrderedDict()
+        # Entries may be added from worker threads as well as the event loop:
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}({len(self)}/{self._maxsize}, "
+            f"hit_ratio={self.hit_ratio:.2f})"
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    @property
+    def evictions(self) -> int:
+        return self._evictions
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self._hits + self._misses
+        return self._hits / lookups if lookups else 0.0
+
+    def get(self, key: K) -> V | None:
+        with self._lock:
+            try:
+                value = self._data[key]
+
+            except KeyError:
+                self._misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self._hits += 1
+            return value
+
+    def put(self, key: K, value: V) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def resize(self, maxsize: int) -> None:
+        if maxsize < 1:
+            raise ValueError(f"LRUCache size must be positive, not {maxsize}")
+        with self._lock:
+            self._maxsize = maxsize
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+                self._evictions += 1
+
+    def replace(self, items: Iterable[tuple[K, V]]) -> None:
+        # Swap the contents in one go, so that no reader sees a partial state:
+        data = OrderedDict(items)
+        evicted = max(0, len(data) - self._maxsize)
+        for _ in range(evicted):
+            data.popitem(last=False)
+
+        with self._lock:
+            self._data = data
+            self._evictions += evicted
+
+    def items(self) -> list[tuple[K, V]]:
+        with self._lock:
+            return list(self._data.items())
+
+
+class SingleFlight[K: Hashable, V]:
+    # Concurrent calls for the same key share the result of the first call,
+    # rather than each computing it again.
+    def __init__(self) -> None:
+        self._inflight: dict[K, asyncio.Task[V]] = {}
+        self._calls = 0
+        self._coalesced = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(inflight={len(self._inflight)}, "
+            f"calls={self._calls}, coalesced={self._coalesced})"
+        )
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    @property
+    def calls(self) -> int:
+        return self._calls
+
+    @property
+    def coalesced(self) -> int:
+        return self._coalesced
+
+    async def run(self, key: K, fn: Callable[[], Awaitable[V]]) -> V:
+        self._calls += 1
+        if (task := self._inflight.get(key)) is not None:
+            self._coalesced += 1
+
+        else:
+
+            async def call() -> V:
+                return await fn()
+
+            task = asyncio.create_task(call(), name=f"SingleFlight for {key}")
+            self._inflight[key] = task
+            # Whoever started the task may go away, and the others still need
+            # the result, so the task cleans up after itself:
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # Shield the task, so that a caller being cancelled does not cancel the
+        # computation for all the others:
+        return await asyncio.shield(task)
@@ -0,0 +1,113 @@
+import logging
+from typing import Any, Never, Self
+
+from pydantic import BaseModel
+
+from .tournament import Tournament
+
+logger = logging.getLogger(__name__)
+
+DELTA_COLLECTIONS = ("entries", "draws", "courts", "matches")
+
+type TournamentDump = dict[str, Any]
+
+
+class CollectionDelta(BaseModel):
+    upsert: dict[str, Any] = {}
+    remove: list[str] = []
+
+    @property
+    def empty(self) -> bool:
+        return not self.upsert and not self.remove
+
+
+class TournamentDelta(BaseModel):
+    base: str
+    version: str
+    attrs: dict[str, Any] = {}
+    collections: dict[str, CollectionDelta] = {}
+
+    def __str__(self) -> str:
+        changes = ", ".join(
+            f"{name} +{len(delta.upsert)}/-{len(delta.remove)}"
+            for name, delta in self.collections.items()
+        )
+        return f"{self.base}→{self.version} ({changes or 'no changes'})"
+
+    @property
+    def empty(self) -> bool:
+        return not self.attrs and not self.collections
+
+    @staticmethod
+    def dump(tournament: Tournament) -> TournamentDump:
+        # JSON mode, so that keys are strings and values compare the same way
+        # on both ends of the wire:
+        return tournament.model_dump(mode="json")
+
+    @classmethod
+    def from_dumps(
+        cls, base: str, old: TournamentDump, version: str, new: TournamentDump
+    ) -> Self:
+        attrs = {
+            key: value
+            for key, value in new.items()
+            if key not in DELTA_COLLECTIONS and old.get(key) != value
+        }
+
+        collections: dict[str, CollectionDelta] = {}
+        for name in DELTA_COLLECTIONS:
+            olditems, newitems = old.get(name, {}), new.get(name, {})
+            delta = CollectionDelta(
+                upsert={
+                    key: value
+                    for key, value in newitems.items()
+                    if olditems.get(key) != value
+                },
+                remove=[key for key in olditems if key not in newitems],
+            )
+            if not delta.empty:
+                collections[name] = delta
+
+        return cls(base=base, version=version, attrs=attrs, collections=collections)
+
+    @classmethod
+    def between(cls, old: Tournament, new: Tournament) -> Self:
+        return cls.from_dumps(old.version, cls.dump(old), new.version, cls.dump(new))
+
+    def apply_to_dump(self, dump: TournamentDump) -> TournamentDump:
+        ret = dump | self.attrs
+        for name, delta in self.collections.items():
+            items = {
+                key: value
+                for key, value in dump.get(name, {}).items()
+                if key not in delta.remove
+            }
+            ret[name] = items | delta.upsert
+        return ret
+
+    def apply[T: Tournament](self, tournament: T) -> T | Never:
+        if tournament.version != self.base:
+            raise ValueError(
+                f"Delta applies to version {self.base}, "
+                f"not version {tournament.version}"
+            )
+
+        # Unchanged entries, draws, courts and matches are carried over as
+        # instances, which Pydantic does not validate again, so that only what
+        # changed needs validating:
+        data: dict[str, Any] = {
+            name: getattr(tournament, name) for name in type(tournament).model_fields
+        } | self.attrs
+        for name, delta in self.collections.items():
+            remove = set(delta.remove)
+            data[name] = {
+                str(key): value
+                for key, value in data.get(name, {}).items()
+                if str(key) not in remove
+            } | delta.upsert
+
+        ret = type(tournament).model_validate(data)
+        # The delta was made from the new tournament, so the digest is known and
+        # saves serialising the result once more:
+        ret._version = self.version
+        return ret
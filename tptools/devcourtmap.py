@@ -1,7 +1,8 @@
+import ipaddress
 import logging
 import re
 import tomllib
-from collections.abc import Iterable
+from collections.abc import Hashable, Iterable
 from typing import IO, Never
 
 from tptools.court import Court
@@ -10,11 +11,80 @@ from tptools.util import flatten_dict
 logger = logging.getLogger(__name__)
 
 
+type IPAddress = ipaddress.IPv4Address | ipaddress.IPv6Address
+type IPNetwork = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+class _TrieNode[V]:
+    __slots__ = ("children", "value")
+
+    def __init__(self) -> None:
+        self.children: list[_TrieNode[V] | None] = [None, None]
+        self.value: V | None = None
+
+
+class PrefixTrie[V]:
+    # Binary trie over the bits of addresses, separately for IPv4 and IPv6, so
+    # that the longest matching prefix is found in O(address bits).
+    def __init__(self) -> None:
+        self._roots: dict[int, _TrieNode[V]] = {4: _TrieNode(), 6: _TrieNode()}
+        self._len = 0
+
+    def __len__(self) -> int:
+        return self._len
+
+    def insert(self, network: IPNetwork, value: V) -> None:
+        node = self._roots[network.version]
+        netint = int(network.network_address)
+        maxbits = network.max_prefixlen
+        for i in range(network.prefixlen):
+            bit = (netint >> (maxbits - 1 - i)) & 1
+            if (child := node.children[bit]) is None:
+                child = node.children[bit] = _TrieNode()
+            node = child
+
+        if node.value is None:
+            self._len += 1
+        node.value = value
+
+    def lookup(self, address: IPAddress) -> V | None:
+        node: _TrieNode[V] | None = self._roots[address.version]
+        addrint = int(address)
+        maxbits = address.max_prefixlen
+        found = None
+        i = 0
+        while node is not None:
+            if node.value is not None:
+                found = node.value
+            if i == maxbits:
+                break
+            node = node.children[(addrint >> (maxbits - 1 - i)) & 1]
+            i += 1
+
+        return found
+
+
 class DeviceCourtMap:
     def __init__(self, tomlfile: IO[bytes] | None = None) -> None:
-        self._devmap: dict[str, int | str] = (
+        self._devmap: dict[str, int | str] = {}
+        self._subnets: PrefixTrie[int | str] = PrefixTrie()
+        self._subnet_values: set[int | str] = set()
+        for key, value in (
             {} if tomlfile is None else self.read_toml_devmap(tomlfile)
-        )
+        ).items():
+            if "/" not in key:
+                self._devmap[key] = value
+                continue
+
+            try:
+                self._subnets.insert(ipaddress.ip_network(key, strict=False), value)
+
+            except ValueError as err:
+                raise ValueError(f"Invalid network in devmap: {key}") from err
+
+            self._subnet_values.add(value)
+
+        self._index: tuple[Hashable, dict[int | str, Court | None]] | None = None
 
     @staticmethod
     def read_toml_devmap(tomlfile: IO[bytes]) -> dict[str, int | str] | Never:
@@ -38,48 +108,98 @@ class DeviceCourtMap:
         else:
             return None
 
+    def _resolve_court(
+        self, courtname: int | str, courts: Iterable[Court]
+    ) -> Court | None:
+        # TODO: can we do better than this to identify the court when we are
+        # given a string that might not be what the current courtnamepolicy
+        # returns, or an ID?
+        if isinstance(courtname, int):
+            for court in courts:
+                if courtname == court.id:
+                    return court
+            return None
+
+        if (term := self.normalise_court_name_for_matching(courtname)) is None:
+            return None
+
+        for court in courts:
+            comps = (
+                []
+                if court.location is None
+                else [
+                    f"{court.location.id}-{court.name}",
+                    f"{court.location.id}-{court}",
+                ]
+            )
+
+            for comparename in (
+                *comps,
+                court.name,
+                str(court),
+            ):
+                comp = self.normalise_court_name_for_matching(comparename)
+                if (
+                    comp is not None
+                    and (term[0] is None and term[1] == comp[1])
+                    or (term == comp)
+                ):
+                    return court
+
+        return None
+
+    def _build_index(self, courts: Iterable[Court]) -> dict[int | str, Court | None]:
+        courts = list(courts)
+        # Many devices usually share the same court, so only resolve each
+        # distinct courtname once:
+        return {
+            courtname: self._resolve_court(courtname, courts)
+            for courtname in {*self._devmap.values(), *self._subnet_values}
+        }
+
     def find_court_for_ip(
-        self, clientip: str, courts: Iterable[Court] | None = None
+        self,
+        clientip: str,
+        courts: Iterable[Court] | None = None,
+        *,
+        courts_version: Hashable | None = None,
     ) -> Court | None:
-        courtname = None
-        if (courtname := self._devmap.get(clientip)) is not None:
-            logger.debug(f"Device at IP {clientip} might be on {courtname}")
-            for court in courts or []:
-                # TODO: can we do better than this to identify the court when we are
-                # given a string that might not be what the current courtnamepolicy
-                # returns, or an ID?
-                if isinstance(courtname, int):
-                    if courtname == court.id:
-                        return court
-
-                else:
-                    term = self.normalise_court_name_for_matching(courtname)
-                    if term is not None:
-                        comps = (
-                            []
-                            if court.location is None
-                            else [
-                                f"{court.location.id}-{court.name}",
-                                f"{court.location.id}-{court}",
-                            ]
-                        )
-
-                        for comparename in (
-                            *comps,
-                            court.name,
-                            str(court),
-                        ):
-                            comp = self.normalise_court_name_for_matching(comparename)
-                            if (
-                                comp is not None
-                                and (term[0] is None and term[1] == comp[1])
-                                or (term == comp)
-                            ):
-                                return court
+        # The devmap cannot change, so the index only needs rebuilding when the
+        # courts change. Without a version, the courts themselves are the key:
+        if courts_version is None:
+            courts = tuple(courts or ())
+            courts_version = courts
+
+        if self._index is None or self._index[0] != courts_version:
+            self._index = courts_version, self._build_index(courts or ())
+            logger.debug(
+                f"Built device to court index for {len(self._index[1])} court names"
+            )
+
+        if (courtname := self._lookup(clientip)) is not None and (
+            court := self._index[1][courtname]
+        ) is not None:
+            logger.debug(f"Device at IP {clientip} is on {court}")
+            return court
 
         logger.debug(f"No court found in devmap for device with IP {clientip}")
         return None
 
+    def _lookup(self, clientip: str) -> int | str | None:
+        if (value := self._devmap.get(clientip)) is not None or not self._subnets:
+            return value
+
+        try:
+            address = ipaddress.ip_address(clientip)
+
+        except ValueError:
+            return None
+
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        return self._subnets.lookup(address)
+
     def find_match_for_ip(self, clientip: str) -> str | None:
-        text = self._devmap.get(clientip)
+        text = self._lookup(clientip)
         return str(text) if text is not None else None
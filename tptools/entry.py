@@ -1,9 +1,11 @@
 import logging
-from typing import NotRequired, TypedDict
+from collections.abc import Hashable
+from typing import NotRequired, TypedDict, cast
 
 from pydantic import TypeAdapter
 
 from .basemodel import BaseModel
+from .cache import LRUCache
 from .draw import Event
 from .namepolicy import (
     ClubNamePolicy,
@@ -11,10 +13,14 @@ from .namepolicy import (
     PairCombinePolicy,
     PlayerNamePolicy,
 )
+from .namepolicy.policybase import PolicyBase
 from .sqlmodels import TPClub, TPCountry, TPEntry, TPPlayer
+from .util import validate_output
 
 logger = logging.getLogger(__name__)
 
+NAME_CACHE_SIZE = 4096
+
 
 class Club(BaseModel[TPClub]):
     id: int
@@ -62,6 +68,28 @@ class PlayerExportStruct(TypedDict):
 
 PlayerExportStructValidator = TypeAdapter(PlayerExportStruct)
 
+# The same entries get named with the same few policies over and over again, for
+# every match they are in, and in every response:
+_names: LRUCache[tuple[Hashable, ...], str | PlayerExportStruct] = LRUCache(
+    NAME_CACHE_SIZE
+)
+
+
+def clear_name_cache() -> None:
+    _names.clear()
+
+
+def _player_key(player: Player | None) -> Hashable:
+    # Everything about a player that name policies might use:
+    if player is None:
+        return None
+    return (
+        player.firstname,
+        player.lastname,
+        None if player.club is None else player.club.name,
+        None if player.country is None else (player.country.name, player.country.code),
+    )
+
 
 class Entry(BaseModel[TPEntry]):
     id: int
@@ -77,6 +105,10 @@ class Entry(BaseModel[TPEntry]):
         playernamepolicy = playernamepolicy or PlayerNamePolicy()
         paircombinepolicy = paircombinepolicy or PairCombinePolicy()
 
+        key = self._names_cache_key("name", playernamepolicy, paircombinepolicy)
+        if key is not None and (cached := _names.get(key)) is not None:
+            return cast(str, cached)
+
         name = playernamepolicy(self.player1)
         if self.player2:
             name = paircombinepolicy(
@@ -85,8 +117,24 @@ class Entry(BaseModel[TPEntry]):
         if name is None:
             raise ValueError(f"No player name discernable from {self}")
 
+        if key is not None:
+            _names.put(key, name)
         return name
 
+    def _names_cache_key(
+        self, kind: str, *policies: PolicyBase
+    ) -> tuple[Hashable, ...] | None:
+        # Policies can be any callable, e.g. a mock, but only the results of
+        # PolicyBase instances are identified by their cache keys:
+        if not all(isinstance(policy, PolicyBase) for policy in policies):
+            return None
+        return (
+            kind,
+            *(policy.cache_key for policy in policies),
+            _player_key(self.player1),
+            _player_key(self.player2),
+        )
+
     def make_player_export_struct(
         self,
         clubnamepolicy: ClubNamePolicy | None = None,
@@ -99,6 +147,17 @@ class Entry(BaseModel[TPEntry]):
         playernamepolicy = playernamepolicy or PlayerNamePolicy()
         paircombinepolicy = paircombinepolicy or PairCombinePolicy()
 
+        key = self._names_cache_key(
+            "export",
+            clubnamepolicy,
+            countrynamepolicy,
+            playernamepolicy,
+            paircombinepolicy,
+        )
+        if key is not None and (cached := _names.get(key)) is not None:
+            # The struct is a dict, which callers must not get to modify:
+            return cast(PlayerExportStruct, cached).copy()
+
         name = self.get_player_name(playernamepolicy, paircombinepolicy)
 
         club = clubnamepolicy(self.player1.club)
@@ -112,15 +171,19 @@ class Entry(BaseModel[TPEntry]):
                 ctry, countrynamepolicy(self.player2.country), first_can_be_none=True
             )
 
-        return PlayerExportStructValidator.validate_python(
+        struct = validate_output(
+            PlayerExportStructValidator,
             {
                 k: v
                 for k, v in (("name", name), ("club", club), ("country", ctry))
                 if v is not None
                 # TODO: omit None from result while
                 # https://github.com/obbimi/Squore/issues/98
-            }
+            },
         )
+        if key is not None:
+            _names.put(key, struct)
+        return struct.copy()
 
     __repr_fields__ = ("event.name", "player1.name", "player2?.name")
     __str_template__ = "{self.player1}{'&'+str(self.player2) if self.player2 else ''}"
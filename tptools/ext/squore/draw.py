@@ -8,6 +8,7 @@ from pydantic import (
 
 from tptools import Draw
 from tptools.namepolicy import DrawNamePolicy
+from tptools.util import validate_output
 
 
 class SquoreDrawStruct(TypedDict):
@@ -21,12 +22,13 @@ SquoreDrawStructValidator = TypeAdapter(SquoreDrawStruct)
 
 class SquoreDrawNamePolicy(DrawNamePolicy):
     def __call__(self, draw: Draw) -> SquoreDrawStruct:  # type: ignore[override]
-        return SquoreDrawStructValidator.validate_python(
+        return validate_output(
+            SquoreDrawStructValidator,
             {
                 "event": draw.stage.event.name,
                 "stage": draw.stage.name,
                 "name": draw.name,
-            }
+            },
         )
 
 
@@ -17,7 +17,7 @@ from pydantic import (
 from ...entry import PlayerExportStruct
 from ...match import Match
 from ...tpmatch import TPMatch
-from ...util import ScoresType
+from ...util import ScoresType, validate_output
 from .config import PerMatchOverridableConfig
 from .court import SquoreCourt
 from .draw import SquoreDraw, SquoreDrawStruct
@@ -65,12 +65,15 @@ class SquoreMatch(Match[SquoreEntry, SquoreDraw, SquoreCourt]):
             CourtClass=SquoreCourt,
         )
 
+    # Not annotated as returning a SquoreMatchStruct: in JSON mode, the handler
+    # already returns str and list where the struct declares datetime and tuple,
+    # and unless validated, Pydantic would warn about every such value:
     @model_serializer(mode="wrap")
     def split_date_from_time(
         self, handler: SerializerFunctionWrapHandler
-    ) -> SquoreMatchStruct:
+    ) -> dict[str, Any]:
         ret: SquoreMatchStruct = handler(self)
         dt = self.time
         ret["date"] = dt.date().strftime("%F") if dt is not None else None
         ret["time"] = dt.time().strftime("%H:%M") if dt is not None else None
-        return SquoreMatchStructValidator.validate_python(ret)
+        return cast(dict[str, Any], validate_output(SquoreMatchStructValidator, ret))
@@ -5,10 +5,17 @@ import threading
 import time
 from collections.abc import Callable
 from contextlib import AbstractAsyncContextManager
+from dataclasses import dataclass, field
 from types import MappingProxyType, TracebackType
 from typing import Any, Protocol, Self
 
-from watchdog.events import FileModifiedEvent, FileSystemEvent, FileSystemEventHandler
+from watchdog.events import (
+    FileCreatedEvent,
+    FileModifiedEvent,
+    FileMovedEvent,
+    FileSystemEvent,
+    FileSystemEventHandler,
+)
 from watchdog.observers import Observer
 from watchdog.observers.api import BaseObserver
 
@@ -17,10 +24,32 @@ logger = logging.getLogger(__name__)
 type StateType = MappingProxyType
 
 
+DEFAULT_CALLBACK_TIMEOUT = 60.0
+
+
 class CallbackType(Protocol):
     async def __call__(self) -> StateType: ...
 
 
+def _callback_name(callback: CallbackType) -> str:
+    name = getattr(callback, "__qualname__", None)
+    return name if isinstance(name, str) else repr(callback)
+
+
+@dataclass
+class CallbackStats:
+    calls: int = 0
+    timeouts: int = 0
+    last_duration: float = 0.0
+    max_duration: float = 0.0
+
+    def record(self, duration: float, *, timed_out: bool = False) -> None:
+        self.calls += 1
+        self.timeouts += int(timed_out)
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+
+
 class AsyncWaitableEvent(threading.Event):
     async def async_wait(self, *, period: float = 0.1) -> None:
         while not super().wait(0):
@@ -47,13 +76,29 @@ class ThreadingEventOnModifiedHandler(FileSystemEventHandler):
 
     def on_modified(
         self, event: FileSystemEvent, *, at_time: float | None = None
+    ) -> None:
+        self._on_change(event, event.src_path, at_time=at_time)
+
+    def on_created(
+        self, event: FileSystemEvent, *, at_time: float | None = None
+    ) -> None:
+        self._on_change(event, event.src_path, at_time=at_time)
+
+    def on_moved(self, event: FileSystemEvent, *, at_time: float | None = None) -> None:
+        # Editors tend to save files by moving a temporary file over the original
+        self._on_change(event, event.dest_path, at_time=at_time)
+
+    def _on_change(
+        self,
+        event: FileSystemEvent,
+        pathstr: str | bytes,
+        *,
+        at_time: float | None = None,
     ) -> None:
         if at_time is None:
             at_time = time.time()
 
-        path = pathlib.Path(
-            srcpath if isinstance(srcpath := event.src_path, str) else srcpath.decode()
-        )
+        path = pathlib.Path(pathstr if isinstance(pathstr, str) else pathstr.decode())
 
         if path != self._path:
             # See the WARNING in the FileWatcher.__init__ constructor for
@@ -72,6 +117,21 @@ class ThreadingEventOnModifiedHandler(FileSystemEventHandler):
             )
 
 
+@dataclass
+class WatchedPath:
+    path: pathlib.Path
+    event: AsyncWaitableEvent
+    callbacks: list[CallbackType] = field(default_factory=list)
+    generation: int = 0
+    superseded_count: int = 0
+
+    @property
+    def superseded(self) -> bool:
+        # The event is cleared when callbacks are invoked, so if it is set again
+        # while they are running, whatever they are loading is already stale:
+        return self.event.is_set()
+
+
 class FileWatcher(AbstractAsyncContextManager[StateType]):
     def __init__(
         self,
@@ -83,43 +143,98 @@ class FileWatcher(AbstractAsyncContextManager[StateType]):
         event_handler_cls: Callable[
             [AsyncWaitableEvent, pathlib.Path], ThreadingEventOnModifiedHandler
         ] = ThreadingEventOnModifiedHandler,
+        callback_timeout: float | None = DEFAULT_CALLBACK_TIMEOUT,
     ) -> None:
         self._path = path
-        self._event = event or AsyncWaitableEvent()
         self._fire_once_asap = fire_once_asap
-        self._callbacks: list[CallbackType] = []
+        self._watches: dict[pathlib.Path, WatchedPath] = {}
+        self._timeouts: dict[CallbackType, float | None] = {}
+        self._callback_timeout = callback_timeout
+        # Keyed by callback, as closures from the same factory share a name:
+        self._stats: dict[CallbackType, CallbackStats] = {}
         self._state: dict[str, Any] = {}
         self._observer = observer or Observer()
+        self._event_handler_cls = event_handler_cls
+        self._event = self.add_path(path, event).event
+        logger.info(f"Initialised FileWatcher on {self._path}")
+
+    def add_path(
+        self, path: pathlib.Path, event: AsyncWaitableEvent | None = None
+    ) -> WatchedPath:
+        if (watch := self._watches.get(path.absolute())) is not None:
+            return watch
+
+        watch = WatchedPath(path=path, event=event or AsyncWaitableEvent())
         self._observer.schedule(
-            event_handler_cls(self._event, self._path),
-            str(self._path.parent.absolute()),
+            self._event_handler_cls(watch.event, path),
+            str(path.parent.absolute()),
             # WARNING: Most likely due to a bug/limitation in `watchdog`
             # (https://github.com/gorakhargosh/watchdog/issues/1034),
             # it is not possible to listen to the file/path directly. Hence,
             # we must observe the file's parent (directory), filter the
-            # generated events for FileModifiedEvent (to weed out
+            # generated events for file events (to weed out e.g.
             # DirModifiedEvent) and then also compare the path of an
             # event to react only when the actual file is modified.
-            event_filter=[FileModifiedEvent],
+            event_filter=[FileModifiedEvent, FileCreatedEvent, FileMovedEvent],
         )
-        logger.info(f"Initialised FileWatcher on {self._path}")
+        self._watches[path.absolute()] = watch
+        logger.debug(f"FileWatcher now also watching {path}")
+        return watch
 
-    def register_callback(self, callback: CallbackType) -> None:
-        self._callbacks.append(callback)
+    def _get_watch(self, path: pathlib.Path | None = None) -> WatchedPath:
+        try:
+            return self._watches[(path or self._path).absolute()]
+
+        except KeyError as err:
+            raise ValueError(f"FileWatcher is not watching {path}") from err
+
+    @property
+    def paths(self) -> list[pathlib.Path]:
+        return [watch.path for watch in self._watches.values()]
+
+    def register_callback(
+        self,
+        callback: CallbackType,
+        *,
+        path: pathlib.Path | None = None,
+        timeout: float | None = None,
+    ) -> None:
+        self._get_watch(path).callbacks.append(callback)
+        if timeout is not None:
+            self._timeouts[callback] = timeout
 
     @property
     def callbacks(self) -> frozenset[CallbackType]:
-        return frozenset(self._callbacks)
+        return frozenset(
+            callback for watch in self._watches.values() for callback in watch.callbacks
+        )
+
+    @property
+    def callback_stats(self) -> MappingProxyType[CallbackType, CallbackStats]:
+        return MappingProxyType(self._stats)
+
+    @property
+    def generation(self) -> int:
+        return self._get_watch().generation
+
+    @property
+    def superseded(self) -> bool:
+        return self._get_watch().superseded
+
+    @property
+    def superseded_count(self) -> int:
+        return sum(watch.superseded_count for watch in self._watches.values())
 
     @property
     def state(self) -> StateType:
         return MappingProxyType(self._state)
 
     def __call__(self) -> Self:
-        logger.debug(f"Configured FileWatcher on {self._path}")
+        logger.debug(f"Configured FileWatcher on {', '.join(map(str, self.paths))}")
         if self._fire_once_asap:
             logger.debug("Firing event handler per fire_once_asap")
-            self._event.set()
+            for watch in self._watches.values():
+                watch.event.set()
         return self
 
     async def __aenter__(self) -> StateType:
@@ -140,25 +255,124 @@ class FileWatcher(AbstractAsyncContextManager[StateType]):
         logger.debug(f"Stopped FileWatcher {self._observer}")
         self._observer.join()
 
-    async def _invoke_callbacks(self) -> None:
-        for callback in self._callbacks:
-            if (state_update := await callback()) is not None:
+    async def _invoke_callback(self, callback: CallbackType) -> StateType | None:
+        name = _callback_name(callback)
+        timeout = self._timeouts.get(callback, self._callback_timeout)
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            async with asyncio.timeout(timeout):
+                return await callback()
+
+        except TimeoutError:
+            timed_out = True
+            logger.warning(f"Callback {name} timed out after {timeout}s, skipping…")
+            return None
+
+        finally:
+            duration = time.perf_counter() - start
+            self._stats.setdefault(callback, CallbackStats()).record(
+                duration, timed_out=timed_out
+            )
+            logger.debug(f"Callback {name} took {duration:.3f}s")
+
+    async def _invoke_callbacks(self, path: pathlib.Path | None = None) -> None:
+        watch = self._get_watch(path)
+        callbacks = list(watch.callbacks)
+        async with asyncio.TaskGroup() as tg:
+            tasks = [
+                tg.create_task(
+                    self._invoke_callback(callback), name=_callback_name(callback)
+                )
+                for callback in callbacks
+            ]
+
+        if watch.superseded:
+            logger.info(
+                f"{watch.path} changed again while invoking callbacks, "
+                "discarding stale results…"
+            )
+            return
+
+        # Merge in registration order, so that the outcome does not depend on
+        # the order in which concurrent callbacks happened to complete:
+        for task in tasks:
+            if (state_update := task.result()) is not None:
                 self._state.update(state_update)
 
-    def fire(self) -> None:
-        self._event.set()
+        if callbacks:
+            slowest = max(callbacks, key=lambda cb: self._stats[cb].last_duration)
+            logger.info(
+                f"Invoked {len(callbacks)} callbacks, slowest was "
+                f"{_callback_name(slowest)} "
+                f"({self._stats[slowest].last_duration:.3f}s)"
+            )
 
-    async def reactor_task(self) -> None:
+    def fire(self, path: pathlib.Path | None = None) -> None:
+        self._get_watch(path).event.set()
+
+    async def _reload(self, watch: WatchedPath) -> None:
+        watch.event.clear()
+        watch.generation += 1
+        generation = watch.generation
+        logger.info(
+            f"{watch.path} changed, invoking callbacks (generation {generation})…"
+        )
+
+        reload = asyncio.create_task(
+            self._invoke_callbacks(watch.path),
+            name=f"FileWatcher reload {generation} of {watch.path}",
+        )
+        change = asyncio.create_task(watch.event.async_wait())
+        try:
+            done, _ = await asyncio.wait(
+                (reload, change), return_when=asyncio.FIRST_COMPLETED
+            )
+
+        except asyncio.CancelledError:
+            reload.cancel()
+            raise
+
+        finally:
+            change.cancel()
+
+        if reload in done:
+            reload.result()
+
+        else:
+            logger.info(
+                f"Reload generation {generation} of {watch.path} superseded "
+                "by newer change, cancelling…"
+            )
+            reload.cancel()
+            # gather() lets a cancellation of this task propagate, but
+            # swallows the CancelledError of the reload task:
+            await asyncio.gather(reload, return_exceptions=True)
+
+        if watch.superseded:
+            watch.superseded_count += 1
+
+    async def _path_reactor_task(self, watch: WatchedPath) -> None:
         while True:
-            try:
-                logger.debug("Waiting for watched file to change…")
-                await self._event.async_wait()
-                logger.info("Watched file changed, invoking callbacks…")
-                await self._invoke_callbacks()
-
-            except asyncio.CancelledError:
-                logger.debug("Cancelling FileWatcher reactor task…")
-                raise
-
-            finally:
-                self._event.clear()
+            logger.debug(f"Waiting for {watch.path} to change…")
+            await watch.event.async_wait()
+            # If the file changes while callbacks are running, the event
+            # remains set and the next iteration starts over immediately:
+            await self._reload(watch)
+
+    async def reactor_task(self) -> None:
+        try:
+            if len(self._watches) == 1:
+                await self._path_reactor_task(self._get_watch())
+
+            else:
+                async with asyncio.TaskGroup() as tg:
+                    for watch in self._watches.values():
+                        tg.create_task(
+                            self._path_reactor_task(watch),
+                            name=f"FileWatcher reactor for {watch.path}",
+                        )
+
+        except asyncio.CancelledError:
+            logger.debug("Cancelling FileWatcher reactor task…")
+            raise
@@ -1,7 +1,8 @@
 import re
 from abc import ABC, abstractmethod
-from collections.abc import Callable
-from dataclasses import asdict, dataclass, replace
+from collections.abc import Callable, Hashable
+from dataclasses import asdict, dataclass, field, replace
+from functools import cached_property
 from typing import Any, Protocol, Self
 
 
@@ -16,6 +17,15 @@ class PolicyBase(ABC):
     def with_(self, **updates: Any) -> Self:
         return replace(self, **updates)
 
+    def _hashable_params(self) -> tuple[Hashable, ...]:
+        return tuple(self.params().items())
+
+    @cached_property
+    def cache_key(self) -> Hashable:
+        # Policies of the same class with the same parameters give the same
+        # results, so this can key caches of those results:
+        return type(self), self._hashable_params()
+
 
 class PolicyCallable[ReturnT](Protocol):
     def __call__(self, *args: Any, **kwargs: Any) -> ReturnT: ...
@@ -29,25 +39,43 @@ class RegexpSubstTuple:
     flags: re.RegexFlag | int | None = None
 
 
+type CompiledSubst = tuple[re.Pattern[str], str | Callable[[re.Match[str]], str], int]
+
+
+def _compile_regexp(regexp: RegexpSubstTuple) -> CompiledSubst:
+    pattern = (
+        regexp.pattern
+        if isinstance(regexp.pattern, re.Pattern) and not regexp.flags
+        else re.compile(regexp.pattern, regexp.flags or 0)
+    )
+    return pattern, regexp.repl, regexp.count
+
+
 @dataclass(frozen=True)
 class NamePolicy(PolicyBase):
     regexps: list[RegexpSubstTuple] | None = None
+    _pipeline: tuple[CompiledSubst, ...] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Policies are immutable, so the patterns can be compiled once, rather
+        # than looked up in the re module's cache for every name:
+        object.__setattr__(
+            self, "_pipeline", tuple(map(_compile_regexp, self.regexps or ()))
+        )
 
     def _apply_regexps(self, instr: str) -> str:
-        if self.regexps is None:
-            return instr
-
-        for regexp in self.regexps:
-            instr = re.sub(
-                regexp.pattern,
-                regexp.repl,
-                instr,
-                count=regexp.count,
-                flags=regexp.flags or 0,
-            )
+        for pattern, repl, count in self._pipeline:
+            instr = pattern.sub(repl, instr, count=count)
         return instr
 
     def params(self) -> dict[str, Any]:
         ret = super().params()
         del ret["regexps"]
+        del ret["_pipeline"]
         return ret
+
+    def _hashable_params(self) -> tuple[Hashable, ...]:
+        return (
+            *super()._hashable_params(),
+            tuple((r.pattern, r.repl, r.count, r.flags) for r in self.regexps or ()),
+        )
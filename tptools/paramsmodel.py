@@ -2,6 +2,8 @@ from typing import Any
 
 from pydantic import BaseModel, ConfigDict
 
+type ParamsKey = tuple[tuple[str, Any], ...]
+
 
 class ParamsModel(BaseModel):
     @classmethod
@@ -14,4 +16,16 @@ class ParamsModel(BaseModel):
     ) -> T:
         return cls(**cls.extract_subset(params))
 
+    @classmethod
+    def subset_key(cls, params: "ParamsModel") -> ParamsKey:
+        # The same as extract_subset(), but hashable, and without validating
+        # again if params already has all the fields, which a superset would:
+        paramsfields = type(params).model_fields
+        if all(name in paramsfields for name in cls.model_fields):
+            return tuple((name, getattr(params, name)) for name in cls.model_fields)
+        return tuple(cls.extract_subset(params).items())
+
+    def params_key(self) -> ParamsKey:
+        return type(self).subset_key(self)
+
     __pydantic_config__ = ConfigDict(extra="ignore")
@@ -1,9 +1,12 @@
+import asyncio
+import hashlib
 import logging
 from collections import defaultdict
-from collections.abc import Iterable
+from collections.abc import Hashable, Iterable
 from typing import Any, Never, Self, cast
 
 from pydantic import (
+    PrivateAttr,
     SerializationInfo,
     model_serializer,
 )
@@ -48,12 +51,48 @@ class Tournament[
     )
     __repr_fields__ = ("name?", "nentries", "ndraws", "ncourts", "nmatches")
 
+    _version: str | None = PrivateAttr(default=None)
+    _json: dict[tuple[Hashable, ...], bytes] = PrivateAttr(default_factory=dict)
+
+    def _changed(self) -> None:
+        # Replace rather than clear the dict, which copies of this instance
+        # might share:
+        self._version = None
+        self._json = {}
+
+    @property
+    def version(self) -> str:
+        # Digest of the contents, computed lazily and reset by the add_* methods.
+        # Modifications made to the dicts directly go unnoticed.
+        if self._version is None:
+            self._version = hashlib.blake2b(self.dump_json(), digest_size=8).hexdigest()
+        return self._version
+
+    def dump_json(
+        self,
+        matchselectionparams: MatchSelectionParams | None = None,
+        *,
+        indent: int | None = None,
+    ) -> bytes:
+        # The same as model_dump_json(), but memoised until the next change, so
+        # that all consumers of a version share the one serialisation:
+        matchselectionparams = matchselectionparams or MatchSelectionParams()
+        key = (matchselectionparams.params_key(), indent)
+        if (data := self._json.get(key)) is None:
+            data = self._json[key] = self.model_dump_json(
+                indent=indent,
+                context={"matchselectionparams": matchselectionparams},
+            ).encode()
+        return data
+
     def add_entry(self, entry: EntryT) -> None:
         if entry.id in self.entries:
             raise ValueError(f"{entry!r} already added")
+        self._changed()
         self.entries[entry.id] = entry
 
     def add_entries(self, entries: Iterable[EntryT]) -> None:
+        self._changed()
         self.entries |= {e.id: e for e in entries}
 
     @property
@@ -69,9 +108,11 @@ class Tournament[
     def add_match(self, match: MatchT) -> None:
         if match.id in self.matches:
             raise ValueError(f"{match!r} already added")
+        self._changed()
         self.matches[match.id] = match
 
     def add_matches(self, matches: Iterable[MatchT]) -> None:
+        self._changed()
         self.matches |= {m.id: m for m in matches}
 
     @property
@@ -135,9 +176,11 @@ class Tournament[
     def add_draw(self, draw: DrawT) -> None:
         if draw.id in self.draws:
             raise ValueError(f"{draw!r} already added")
+        self._changed()
         self.draws[draw.id] = draw
 
     def add_draws(self, draws: Iterable[DrawT]) -> None:
+        self._changed()
         self.draws |= {d.id: d for d in draws}
 
     @property
@@ -153,9 +196,11 @@ class Tournament[
     def add_court(self, court: CourtT) -> None:
         if court.id in self.courts:
             raise ValueError(f"{court!r} already added")
+        self._changed()
         self.courts[court.id] = court
 
     def add_courts(self, courts: Iterable[CourtT]) -> None:
+        self._changed()
         self.courts |= {c.id: c for c in courts}
 
     @property
@@ -191,7 +236,9 @@ class Tournament[
 
     @classmethod
     def from_tournament(cls, tournament: "Tournament") -> Self:
-        return cls.model_validate(tournament.model_dump())
+        ret = cls.model_validate(tournament.model_dump())
+        ret._version = tournament.version
+        return ret
 
 
 async def load_tournament(
@@ -211,6 +258,10 @@ async def load_tournament(
     ).one_or_none()
     entries = [EntryClass.from_tp_model(e) for e in db_session.exec(select(TPEntry))]
 
+    # Loading is synchronous, but yield to the event loop between the steps, so
+    # that a load superseded by a newer change can be cancelled cooperatively:
+    await asyncio.sleep(0)
+
     try:
         draws = [DrawClass.from_tp_model(d) for d in db_session.exec(select(TPDraw))]
 
@@ -223,9 +274,12 @@ async def load_tournament(
         raise
 
     courts = [CourtClass.from_tp_model(c) for c in db_session.exec(select(TPCourt))]
+    await asyncio.sleep(0)
+
     mm = TPMatchMaker()
     for pm in db_session.exec(select(TPPlayerMatch)):
         mm.add_playermatch(pm)
+    await asyncio.sleep(0)
 
     mm.resolve_unmatched()
     mm.resolve_match_entries()
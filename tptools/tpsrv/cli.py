@@ -34,6 +34,9 @@ PLUGINS = [
     "sq_stdout",
 ]
 
+# Streaming and long-polling clients would otherwise hold up the shutdown:
+GRACEFUL_SHUTDOWN_TIMEOUT = 5
+
 
 try:
     from uvloop import new_event_loop
@@ -165,7 +168,12 @@ def runit(
     loop = new_event_loop()
     asyncio.set_event_loop(loop)
 
-    config = uvicorn.Config(clictx.api, host=host, port=port)
+    config = uvicorn.Config(
+        clictx.api,
+        host=host,
+        port=port,
+        timeout_graceful_shutdown=GRACEFUL_SHUTDOWN_TIMEOUT,
+    )
     server = uvicorn.Server(config)
 
     # We do not use FastAPI's/Starlette's lifespan because of
@@ -1,59 +1,528 @@
 import asyncio
+import hashlib
 import logging
+import pathlib
+import random
+import time
 from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from functools import partial
-from typing import Any, cast
+from dataclasses import dataclass
+from functools import cached_property, partial
+from typing import cast
 
 import click
 from click_async_plugins import PluginLifespan, plugin, react_to_data_update
-from httpx import URL
+from httpx import URL, AsyncClient, HTTPError, HTTPStatusError, Response
+from httpx import codes as status_codes
 
 from tptools import Tournament
+from tptools.cache import LRUCache, SingleFlight
+from tptools.delta import TournamentDelta, TournamentDump
 
 from .util import (
+    COMPRESS_MIN_SIZE,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_TIMEOUT,
     CliContext,
-    PostData,
-    http_request,
+    EncodedBody,
+    make_http_client,
+    make_request_args,
+    negotiate_content_coding,
     pass_clictx,
+    response_json,
+    send_request,
     validate_urls,
 )
 
 logger = logging.getLogger(__name__)
 
 
-async def post_to_urls(
-    tournament: Tournament, urls: list[URL], cookie: int, *, retries: int = 1
-) -> None:
-    logger.info(f"Tournament changed, posting to {len(urls)} URLs")
+POST_BACKOFF_INITIAL = 1.0
+POST_BACKOFF_MAX = 60.0
+POST_CIRCUIT_THRESHOLD = 3
+POST_LATENCY_EWMA_ALPHA = 0.2
+POST_DELTA_HISTORY_SIZE = 8
+
+
+@dataclass(frozen=True)
+class Payload:
+    version: str
+    content: bytes
+    base: str | None = None
+
+    def __str__(self) -> str:
+        what = "version" if self.base is None else f"delta from {self.base} to"
+        return f"{what} {self.version} ({len(self.content)} bytes)"
+
+    @cached_property
+    def encoded(self) -> EncodedBody:
+        # Shared between targets, so each coding is only compressed once:
+        return EncodedBody(self.content)
+
+
+def make_payload(tournament: Tournament, cookie: int) -> Payload:
+    # The JSON of PostData, but only the envelope needs serialising, as the
+    # tournament memoises its JSON:
+    return Payload(
+        version=tournament.version,
+        content=b'{"cookie":%d,"data":%s}' % (cookie, tournament.dump_json()),
+    )
+
+
+def backoff_delay(
+    failures: int,
+    *,
+    initial: float = POST_BACKOFF_INITIAL,
+    maximum: float = POST_BACKOFF_MAX,
+) -> float:
+    # Exponential and capped, with jitter, so that targets that failed at the
+    # same time, e.g. because the network went down, don't retry in lockstep:
+    delay = min(maximum, initial * 2.0 ** min(failures - 1, 32))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def is_transient_failure(resp: Response) -> bool:
+    # Proxies answer like this while the receiver is down, e.g. restarting, and
+    # receivers while they are overloaded, so these are worth retrying:
+    return resp.status_code == status_codes.TOO_MANY_REQUESTS or resp.is_server_error
+
+
+class DeltaMaker:
+    # Keeps the most recent tournament versions, to make deltas from versions
+    # that targets acknowledged to the latest. That takes a dump of each, so
+    # it happens in a thread, and only once for all targets on the same base:
+    def __init__(
+        self, cookie: int, history_size: int = POST_DELTA_HISTORY_SIZE
+    ) -> None:
+        self._cookie = cookie
+        self._tournaments: LRUCache[str, Tournament] = LRUCache(history_size)
+        self._dumps: LRUCache[str, TournamentDump] = LRUCache(history_size)
+        self._deltas: LRUCache[tuple[str, str], Payload] = LRUCache(history_size)
+        self._flights: SingleFlight[tuple[str, str], Payload | None] = SingleFlight()
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}({len(self._tournaments)} versions)>"
+
+    def add(self, tournament: Tournament) -> None:
+        self._tournaments.put(tournament.version, tournament)
+
+    async def get(self, base: str, version: str) -> Payload | None:
+        if (payload := self._deltas.get((base, version))) is not None:
+            return payload
+        return await self._flights.run(
+            (base, version), partial(asyncio.to_thread, self._make, base, version)
+        )
+
+    def _dump(self, version: str) -> TournamentDump | None:
+        if (dump := self._dumps.get(version)) is None:
+            if (tournament := self._tournaments.get(version)) is None:
+                return None
+            dump = TournamentDelta.dump(tournament)
+            self._dumps.put(version, dump)
+        return dump
+
+    def _make(self, base: str, version: str) -> Payload | None:
+        if (old := self._dump(base)) is None or (new := self._dump(version)) is None:
+            return None
+        delta = TournamentDelta.from_dumps(base, old, version, new)
+        payload = Payload(
+            version=version,
+            content=b'{"cookie":%d,"data":%s}'
+            % (self._cookie, delta.model_dump_json().encode()),
+            base=base,
+        )
+        self._deltas.put((base, version), payload)
+        return payload
+
+
+@dataclass
+class PostStats:
+    posted: int = 0
+    deltas: int = 0
+    failed: int = 0
+    superseded: int = 0
+
+
+@dataclass
+class TargetHealth:
+    # The latency is a moving average over successful POSTs, and retry_at is
+    # the monotonic time before which the target is not to be bothered again:
+    latency: float | None = None
+    failures: int = 0
+    retry_at: float = 0.0
+
+    def __str__(self) -> str:
+        latency = "?" if self.latency is None else f"{self.latency * 1000:.0f}ms"
+        circuit = "open" if self.circuit_open else "closed"
+        return f"latency {latency}, {self.failures} failures, circuit {circuit}"
+
+    @property
+    def circuit_open(self) -> bool:
+        return self.failures >= POST_CIRCUIT_THRESHOLD
+
+    @property
+    def cooldown(self) -> float:
+        return max(0.0, self.retry_at - time.monotonic())
+
+    def record_success(
+        self, latency: float, *, alpha: float = POST_LATENCY_EWMA_ALPHA
+    ) -> None:
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency = alpha * latency + (1 - alpha) * self.latency
+        self.failures = 0
+        self.retry_at = 0.0
+
+    def record_failure(self, cooldown: float) -> None:
+        self.failures += 1
+        self.retry_at = time.monotonic() + cooldown
+
+
+class PostTarget:
+    # Posts payloads to a URL, one at a time, and latest wins: a payload
+    # submitted while another one is still pending replaces it, and a failed
+    # payload is not retried if there is a newer one to post instead.
+    #
+    # Failures back off exponentially across payloads, until a POST succeeds,
+    # and after a few in a row, the circuit opens: the target is then assumed
+    # dead, and only tried again once per backoff period, with whatever payload
+    # is the latest by then.
+    #
+    # If a spool directory is given, a payload that could not be posted is kept
+    # there until one succeeds, and posted first thing after a restart.
+    #
+    # Receivers that acknowledge the version they received (i.e. tp-recv) get
+    # deltas from that version, if a DeltaMaker is given, and if they reject
+    # one, e.g. because they restarted in the meantime, the entire tournament.
+    #
+    # Receivers that advertise Accept-Encoding in their responses (RFC 7694)
+    # get compressed data from then on, if compression is enabled:
+    def __init__(
+        self,
+        url: URL,
+        client: AsyncClient,
+        *,
+        retries: int | None = None,
+        backoff: float = POST_BACKOFF_INITIAL,
+        max_backoff: float = POST_BACKOFF_MAX,
+        spool_dir: pathlib.Path | None = None,
+        deltas: DeltaMaker | None = None,
+        compress: bool = True,
+    ) -> None:
+        self._url = url
+        self._delta_url = url.copy_with(path=f"{url.path.rstrip('/')}/delta")
+        self._client = client
+        self._deltas = deltas
+        self._acked: str | None = None
+        self._compress = compress
+        self._coding: str | None = None
+        self._retries = retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._spool_dir = spool_dir
+        self._spool_prefix = hashlib.blake2b(
+            str(url).encode(), digest_size=8
+        ).hexdigest()
+        self._health = TargetHealth()
+        # The version in the spool, if any:
+        self._spooled: str | None = None
+        self._pending: Payload | None = None
+        self._wakeup = asyncio.Event()
+        self._stats = PostStats()
+        if (spooled := self._load_spool()) is not None:
+            logger.info(f"Found {spooled} for {self._url} in the spool")
+            self.submit(spooled)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}({self._url}) {self._stats}, {self._health}>"
+
+    @property
+    def url(self) -> URL:
+        return self._url
+
+    @property
+    def stats(self) -> PostStats:
+        return self._stats
+
+    @property
+    def health(self) -> TargetHealth:
+        return self._health
+
+    @property
+    def acked(self) -> str | None:
+        return self._acked
+
+    @property
+    def coding(self) -> str | None:
+        return self._coding
+
+    def submit(self, payload: Payload) -> None:
+        if self._pending is not None:
+            logger.info(f"Not posting {self._pending} to {self._url}, superseded")
+            self._stats.superseded += 1
+        self._pending = payload
+        self._wakeup.set()
+
+    async def run(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if (payload := self._pending) is not None:
+                self._pending = None
+                await self._post(payload)
+
+    async def _post(self, payload: Payload) -> None:
+        retries = self._retries
+        health = self._health
+        while True:
+            if (cooldown := health.cooldown) > 0:
+                await asyncio.sleep(cooldown)
+                if self._pending is not None:
+                    # The next iteration of run() posts the newer payload:
+                    logger.info(f"Not posting {payload} to {self._url}, superseded")
+                    self._stats.superseded += 1
+                    return
+
+            start = time.monotonic()
+            try:
+                resp = await self._send(payload)
+
+            except HTTPError as err:
+                await self._record_failure(payload, err)
+                if retries is not None and retries <= 0:
+                    logger.error(f"Giving up posting {payload} to {self._url}: {err}")
+                    self._stats.failed += 1
+                    return
+
+                if retries is not None:
+                    retries -= 1
+
+            else:
+                await self._record_success(payload, resp, time.monotonic() - start)
+                return
+
+    async def _send(self, payload: Payload) -> Response:
+        # Raises HTTPError if the URL cannot be reached, or fails transiently:
+        if (delta := await self._make_delta(payload)) is not None:
+            resp = await self._request(self._delta_url, delta)
+            if self._acknowledge(resp, delta):
+                self._stats.deltas += 1
+                return resp
+            logger.info(f"{self._url} did not take {delta}, posting in full instead")
 
-    def log_done_task(task: asyncio.Task[dict[str, Any] | None]) -> None:
-        logger.debug(f"Task done: {task}")
+        resp = await self._request(self._url, payload)
+        _ = self._acknowledge(resp, payload)
+        return resp
 
-    data = PostData(cookie=cookie, data=tournament)
+    async def _request(self, url: URL, payload: Payload) -> Response:
+        coding = self._coding if len(payload.content) >= COMPRESS_MIN_SIZE else None
+        if coding is None:
+            request_args = make_request_args("POST", url, content=payload.content)
 
-    async with asyncio.TaskGroup() as tg:
-        for url in urls:
-            task = tg.create_task(
-                http_request(method="POST", url=url, data=data, retries=retries),
-                name=f"Posting Tournament to {url}",
+        else:
+            # Compressing is CPU-bound, but happens only once per payload:
+            content = await asyncio.to_thread(payload.encoded.encode, coding)
+            request_args = make_request_args("POST", url, content=content)
+            request_args["headers"]["Content-Encoding"] = coding
+
+        resp = await send_request(self._client, request_args)
+        if coding is not None and (
+            resp.status_code == status_codes.UNSUPPORTED_MEDIA_TYPE
+        ):
+            logger.info(f"{url} does not take {coding} data, posting it uncompressed")
+            self._coding = None
+            return await self._request(url, payload)
+
+        if is_transient_failure(resp):
+            raise HTTPStatusError(
+                f"{resp.status_code} {resp.reason_phrase}",
+                request=resp.request,
+                response=resp,
+            )
+
+        if self._compress:
+            self._coding = negotiate_content_coding(resp.headers.get("Accept-Encoding"))
+        return resp
+
+    async def _make_delta(self, payload: Payload) -> Payload | None:
+        if self._deltas is None or self._acked in (None, payload.version):
+            return None
+        return await self._deltas.get(self._acked, payload.version)
+
+    def _acknowledge(self, resp: Response, payload: Payload) -> bool:
+        # Only a receiver that ends up with the same version can take deltas:
+        data = response_json(resp)
+        self._acked = (
+            payload.version
+            if resp.status_code == status_codes.OK
+            and isinstance(data, dict)
+            and data.get("version") == payload.version
+            else None
+        )
+        return self._acked is not None
+
+    async def _record_success(
+        self, payload: Payload, resp: Response, latency: float
+    ) -> None:
+        recovered = self._health.failures > 0
+        self._health.record_success(latency)
+        if not resp.is_success:
+            # The target is up, but retrying the payload would not help, and it
+            # stays in the spool, as it was not delivered:
+            logger.error(
+                f"{self._url} rejected {payload}: "
+                f"{resp.status_code} {resp.reason_phrase}"
+            )
+            self._stats.failed += 1
+            return
+
+        self._stats.posted += 1
+        if recovered:
+            logger.info(f"Posted {payload} to {self._url}, which recovered")
+        if self._spooled is not None:
+            await asyncio.to_thread(self._unspool)
+
+    async def _record_failure(self, payload: Payload, err: HTTPError) -> None:
+        health = self._health
+        was_open = health.circuit_open
+        health.record_failure(
+            backoff_delay(
+                health.failures + 1, initial=self._backoff, maximum=self._max_backoff
+            )
+        )
+        # Whatever failed last is the latest, and replaces an older payload:
+        if self._spool_dir is not None and payload.version != self._spooled:
+            await asyncio.to_thread(self._spool, payload)
+
+        msg = f"{self._url}: {err}, next attempt in {health.cooldown:.1f}s…"
+        if was_open:
+            logger.debug(f"Still cannot post {payload} to {msg}")
+        elif health.circuit_open:
+            logger.warning(
+                f"Failed {health.failures} times in a row to post {payload} to {msg}"
             )
-            logger.debug(f"Task for posting to {url}: {task}")
-            task.add_done_callback(log_done_task)
+        else:
+            logger.warning(f"Problem posting {payload} to {msg}")
+
+    def _spool_files(self) -> list[pathlib.Path]:
+        if self._spool_dir is None:
+            return []
+        return sorted(
+            self._spool_dir.glob(f"{self._spool_prefix}-*.json"),
+            key=lambda p: p.stat().st_mtime,
+        )
+
+    def _spool(self, payload: Payload) -> None:
+        if self._spool_dir is None:
+            return
+        path = self._spool_dir / f"{self._spool_prefix}-{payload.version}.json"
+        tmppath = path.with_suffix(".tmp")
+        try:
+            self._spool_dir.mkdir(parents=True, exist_ok=True)
+            _ = tmppath.write_bytes(payload.content)
+            _ = tmppath.replace(path)
+            for oldpath in self._spool_files():
+                if oldpath != path:
+                    oldpath.unlink(missing_ok=True)
+            self._spooled = payload.version
+            logger.debug(f"Spooled {payload} for {self._url} to {path}")
+
+        except OSError as err:
+            logger.warning(f"Cannot spool {payload} for {self._url}: {err}")
+
+    def _unspool(self) -> None:
+        for path in self._spool_files():
+            path.unlink(missing_ok=True)
+        self._spooled = None
+
+    def _load_spool(self) -> Payload | None:
+        if not (paths := self._spool_files()):
+            return None
+        path = paths[-1]
+        version = path.stem.removeprefix(f"{self._spool_prefix}-")
+        try:
+            payload = Payload(version=version, content=path.read_bytes())
 
-    logger.info(f"Done posting to {len(urls)} URLs")
+        except OSError as err:
+            logger.warning(f"Cannot read spooled data for {self._url}: {err}")
+            return None
+
+        self._spooled = version
+        return payload
+
+
+def post_to_targets(
+    tournament: Tournament,
+    targets: list[PostTarget],
+    cookie: int,
+    deltas: DeltaMaker | None = None,
+) -> None:
+    if deltas is not None:
+        deltas.add(tournament)
+    # Serialise once, and share the bytes between all targets and retries:
+    payload = make_payload(tournament, cookie)
+    logger.info(f"Tournament changed, posting {payload} to {len(targets)} URLs")
+    for target in targets:
+        target.submit(payload)
 
 
 @asynccontextmanager
 async def post_tournament(
-    clictx: CliContext, urls: list[URL], retries: int
+    clictx: CliContext,
+    urls: list[URL],
+    retries: int | None = None,
+    timeout: float = HTTP_TIMEOUT,
+    max_connections: int = HTTP_MAX_CONNECTIONS,
+    spool_dir: pathlib.Path | None = None,
+    send_deltas: bool = True,
+    compress: bool = True,
 ) -> PluginLifespan:
-    callback = partial(post_to_urls, urls=urls, retries=retries, cookie=hash(clictx))
-    updates_gen = cast(
-        AsyncGenerator[Tournament],
-        clictx.itc.updates("tournament", yield_immediately=True),
-    )
-    yield react_to_data_update(updates_gen, callback=callback)
+    # The client lives as long as the plugin, so that connections to the URLs
+    # are kept alive between updates. Each target only ever has one request in
+    # flight, so with a connection for each, a hanging target cannot starve the
+    # others of connections:
+    async with make_http_client(
+        timeout=timeout, max_connections=max(max_connections, len(urls))
+    ) as client:
+        deltas = DeltaMaker(cookie=hash(clictx)) if send_deltas else None
+        targets = [
+            PostTarget(
+                url,
+                client,
+                retries=retries,
+                spool_dir=spool_dir,
+                deltas=deltas,
+                compress=compress,
+            )
+            for url in urls
+        ]
+
+        async def callback(tournament: Tournament) -> None:
+            post_to_targets(tournament, targets, cookie=hash(clictx), deltas=deltas)
+
+        updates_gen = cast(
+            AsyncGenerator[Tournament],
+            clictx.itc.updates("tournament", yield_immediately=True),
+        )
+
+        async def post_tasks() -> None:
+            async with asyncio.TaskGroup() as tg:
+                tasks = [
+                    tg.create_task(
+                        target.run(), name=f"Posting Tournament to {target.url}"
+                    )
+                    for target in targets
+                ]
+                # This returns when cancelled, so the targets need stopping:
+                await react_to_data_update(updates_gen, callback=callback)
+                for task in tasks:
+                    _ = task.cancel()
+
+            for target in targets:
+                logger.debug(f"Stopped {target!r}")
+
+        yield post_tasks()
 
 
 @plugin
@@ -72,14 +541,69 @@ async def post_tournament(
 @click.option(
     "--retries",
     "-r",
+    type=click.IntRange(min=0),
+    default=None,
+    help=(
+        "Number of times to retry POSTing data to URLs before giving up "
+        "(default: retry until posted or superseded)"
+    ),
+)
+@click.option(
+    "--timeout",
+    "-t",
+    type=click.FloatRange(min=0, min_open=True),
+    default=HTTP_TIMEOUT,
+    show_default=True,
+    help="Seconds to wait for connecting to, or hearing back from URLs",
+)
+@click.option(
+    "--max-connections",
     type=click.IntRange(min=1),
-    default=1,
+    default=HTTP_MAX_CONNECTIONS,
     show_default=True,
-    help="Number of times to retry POSTing to URLs",
+    help="Maximum number of concurrent connections to URLs",
+)
+@click.option(
+    "--spool-dir",
+    metavar="PATH",
+    type=click.Path(file_okay=False, path_type=pathlib.Path),
+    default=None,
+    help="Keep data not yet posted in this directory, to post after a restart",
+)
+@click.option(
+    "--deltas/--no-deltas",
+    "send_deltas",
+    default=True,
+    show_default=True,
+    help="Only post changes to URLs that can take them (i.e. tpsrv tp-recv)",
+)
+@click.option(
+    "--compress/--no-compress",
+    default=True,
+    show_default=True,
+    help="Compress data posted to URLs that can take it (i.e. tpsrv tp-recv)",
 )
 @pass_clictx
-async def post(clictx: CliContext, urls: list[URL], retries: int) -> PluginLifespan:
+async def post(
+    clictx: CliContext,
+    urls: list[URL],
+    retries: int | None,
+    timeout: float,
+    max_connections: int,
+    spool_dir: pathlib.Path | None,
+    send_deltas: bool,
+    compress: bool,
+) -> PluginLifespan:
     """Post raw (TP) JSON data to URLs on change"""
 
-    async with post_tournament(clictx, urls, retries) as task:
+    async with post_tournament(
+        clictx,
+        urls,
+        retries,
+        timeout=timeout,
+        max_connections=max_connections,
+        spool_dir=spool_dir,
+        send_deltas=send_deltas,
+        compress=compress,
+    ) as task:
         yield task
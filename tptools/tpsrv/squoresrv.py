@@ -1,25 +1,40 @@
 # {{{ Globals
 
+import asyncio
+import contextlib
 import dataclasses
+import functools
 import importlib.resources
 import json
 import logging
 import pathlib
 import re
 import tomllib
-from collections.abc import AsyncGenerator
+from collections.abc import AsyncGenerator, Callable, Hashable, Iterable
 from contextlib import asynccontextmanager
 from operator import attrgetter
-from typing import Annotated, Any, Never, cast
+from types import MappingProxyType
+from typing import IO, Annotated, Any, Never, cast
 from warnings import warn
 
 import click
 from click_async_plugins import PluginLifespan, plugin, react_to_data_update
-from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request
-from fastapi.responses import PlainTextResponse, RedirectResponse
+from fastapi import (
+    APIRouter,
+    Depends,
+    FastAPI,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from starlette.status import (
+    HTTP_304_NOT_MODIFIED,
     HTTP_307_TEMPORARY_REDIRECT,
     HTTP_308_PERMANENT_REDIRECT,
     HTTP_404_NOT_FOUND,
@@ -37,6 +52,8 @@ from tptools import (
     MatchSelectionParams,
     Tournament,
 )
+from tptools.cache import CachedFile, LRUCache, SingleFlight
+from tptools.entry import clear_name_cache
 from tptools.ext.squore import (
     Config,
     ConfigValidator,
@@ -47,6 +64,7 @@ from tptools.ext.squore import (
 from tptools.ext.squore.court import SquoreCourt
 from tptools.ext.squore.draw import SquoreDraw
 from tptools.ext.squore.entry import SquoreEntry
+from tptools.filewatcher import CallbackType, FileWatcher, StateType
 from tptools.namepolicy import (
     ClubNamePolicy,
     CountryNamePolicy,
@@ -58,13 +76,24 @@ from tptools.namepolicy import (
     PlayerNamePolicy,
     PlayerNamePolicyParams,
 )
-from tptools.namepolicy.policybase import RegexpSubstTuple
+from tptools.namepolicy.policybase import PolicyBase, RegexpSubstTuple
+from tptools.paramsmodel import ParamsKey, ParamsModel
 from tptools.util import (
     normalise_dict_values_for_query_string,
     silence_logger,
 )
 
-from .util import CliContext, pass_clictx
+from .util import (
+    COMPRESS_MIN_SIZE,
+    GZIP_LEVEL,
+    ChangeNotifier,
+    CliContext,
+    EncodedBody,
+    encoded_response,
+    etag_matches,
+    make_etag,
+    pass_clictx,
+)
 
 with importlib.resources.path("tptools", "ext", "squore", "assets") as assets_path:
     SETTINGS_JSON_PATH = assets_path / "settings.json"
@@ -74,6 +103,12 @@ with importlib.resources.path("tptools", "ext", "squore", "assets") as assets_pa
 DEVMAP_TOML_PATH = pathlib.Path("Squore.dev_court_map.toml")
 SQUORE_PATH_VERSION = "v1"
 API_MOUNTPOINT = "/squore"
+SQUORE_FILES_REVALIDATE_INTERVAL = 5.0
+FEED_CACHE_SIZE = 256
+FEED_VARIANTS_SIZE = 8
+POLICY_CACHE_SIZE = 64
+LONGPOLL_PARAM = "wait"
+LONGPOLL_MAX_WAIT = 300
 
 # }}}
 
@@ -105,6 +140,31 @@ def get_squoredevqueryparams(
     return squoredev
 
 
+# }}}
+
+# {{{ Policy cache
+
+# Policies only depend on their parameters, so identical requests can share the
+# same instances, rather than each building their own:
+_policies: LRUCache[tuple[type[PolicyBase], ParamsKey], PolicyBase] = LRUCache(
+    POLICY_CACHE_SIZE
+)
+
+
+def _get_policy[T: PolicyBase](
+    policycls: type[T],
+    paramscls: type[ParamsModel],
+    policyparams: ParamsModel,
+    **kwargs: Any,
+) -> T:
+    # kwargs are not part of the key, as they never vary for a policy class:
+    key = (policycls, paramscls.subset_key(policyparams))
+    if (policy := _policies.get(key)) is None:
+        policy = policycls(**dict(key[1]), **kwargs)
+        _policies.put(key, policy)
+    return cast(T, policy)
+
+
 # }}}
 
 # {{{ Player name policies
@@ -116,32 +176,38 @@ class PlayersPolicyParams(PlayerNamePolicyParams, PairCombinePolicyParams): ...
 def get_playernamepolicy(
     policyparams: Annotated[PlayerNamePolicyParams, Query()],
 ) -> PlayerNamePolicy:
-    return PlayerNamePolicy(**PlayerNamePolicyParams.extract_subset(policyparams))
+    return _get_policy(PlayerNamePolicy, PlayerNamePolicyParams, policyparams)
 
 
 def get_paircombinepolicy(
     policyparams: Annotated[PairCombinePolicyParams, Query()],
 ) -> PairCombinePolicy:
-    return PairCombinePolicy(**PairCombinePolicyParams.extract_subset(policyparams))
+    return _get_policy(PairCombinePolicy, PairCombinePolicyParams, policyparams)
 
 
 # }}}
 
 # {{{ Court, club, country name policies
 
+COURTNAME_REGEXPS = [RegexpSubstTuple(r"^[cC]0?(?P<nr>\d+)", r"Court \g<nr>")]
+CLUBNAME_POLICY = ClubNamePolicy(
+    regexps=[RegexpSubstTuple("vereinslos", "", flags=re.IGNORECASE)]
+)
+
 
 def get_courtnamepolicy(
     policyparams: Annotated[CourtNamePolicyParams, Query()],
 ) -> CourtNamePolicy:
-    c_to_court_subst = RegexpSubstTuple(r"^[cC]0?(?P<nr>\d+)", r"Court \g<nr>")
-    return CourtNamePolicy(
-        regexps=[c_to_court_subst], **CourtNamePolicyParams.extract_subset(policyparams)
+    return _get_policy(
+        CourtNamePolicy,
+        CourtNamePolicyParams,
+        policyparams,
+        regexps=COURTNAME_REGEXPS,
     )
 
 
 def get_clubnamepolicy() -> ClubNamePolicy:
-    vereinslos_is_none = RegexpSubstTuple("vereinslos", "", re.IGNORECASE)
-    return ClubNamePolicy(regexps=[vereinslos_is_none])
+    return CLUBNAME_POLICY
 
 
 class CountryNamePolicyParamsDefaultsCountryCode(CountryNamePolicyParams):
@@ -152,8 +218,8 @@ class CountryNamePolicyParamsDefaultsCountryCode(CountryNamePolicyParams):
 def get_countrynamepolicy(
     policyparams: Annotated[CountryNamePolicyParamsDefaultsCountryCode, Query()],
 ) -> CountryNamePolicy:
-    return CountryNamePolicy(
-        **CountryNamePolicyParamsDefaultsCountryCode.extract_subset(policyparams)
+    return _get_policy(
+        CountryNamePolicy, CountryNamePolicyParamsDefaultsCountryCode, policyparams
     )
 
 
@@ -285,6 +351,147 @@ def get_commandlineparams(request: Request) -> CommandLineParams:
         ) from err
 
 
+# }}}
+
+# {{{ Rendered feed cache
+
+
+@dataclasses.dataclass(frozen=True)
+class RenderedFeed:
+    body: bytes
+    nummatches: int
+
+    @functools.cached_property
+    def encoded(self) -> EncodedBody:
+        # Cached along with the feed, so that it is compressed at most once:
+        return EncodedBody(self.body)
+
+
+type FeedCache = LRUCache[tuple[Hashable, ...], RenderedFeed]
+
+FeedDictAdapter = TypeAdapter(dict[str, Any])
+
+
+def get_feed_cache(request: Request) -> FeedCache:
+    return cast(FeedCache, get_squore_state(request, "feedcache"))
+
+
+@dataclasses.dataclass(frozen=True)
+class FeedVariant:
+    origin: URL
+    matchpolicyparams: MatchesPolicyParams
+    matchselectionparams: MatchSelectionParamsDefaultsOnlyReady
+
+    @property
+    def key(self) -> tuple[Hashable, ...]:
+        return (
+            str(self.origin),
+            self.matchpolicyparams.params_key(),
+            self.matchselectionparams.params_key(),
+        )
+
+
+type FeedVariants = LRUCache[tuple[Hashable, ...], FeedVariant]
+type FeedFlights = SingleFlight[tuple[Hashable, ...], RenderedFeed]
+
+
+def get_feed_variants(request: Request) -> FeedVariants:
+    return cast(FeedVariants, get_squore_state(request, "feedvariants"))
+
+
+def get_feed_flights(request: Request) -> FeedFlights:
+    return cast(FeedFlights, get_squore_state(request, "feedflights"))
+
+
+def _feed_cache_key(
+    tournament: SquoreTournament,
+    configversion: str | None,
+    variant: FeedVariant,
+    matchesinfeedselectionparams: MatchesInFeedSelectionParams,
+) -> tuple[Hashable, ...]:
+    # The policies are all derived from the parameters, and the config depends on
+    # the origin, due to the PostResult URL rewrite:
+    return (
+        tournament.version,
+        configversion,
+        *variant.key,
+        matchesinfeedselectionparams.params_key(),
+    )
+
+
+def render_matches_feed(
+    tournament: SquoreTournament,
+    config: Config,
+    variant: FeedVariant,
+    matchesinfeedselectionparams: MatchesInFeedSelectionParams,
+) -> RenderedFeed:
+    policyparams = variant.matchpolicyparams
+    if not policyparams.use_country_code:
+        logger.warning("Overriding CountryNamePolicy.use_country_code = True")
+
+    countrynamepolicy = dataclasses.replace(
+        get_countrynamepolicy(policyparams), use_country_code=True, titlecase=False
+    )
+
+    logger.info(
+        f"Making MatchesFeed ({variant.matchselectionparams}, "
+        f"{matchesinfeedselectionparams})"
+    )
+
+    feed = MatchesFeed(tournament=tournament, config=config).model_dump(
+        context={
+            "courtnamepolicy": get_courtnamepolicy(policyparams),
+            "paircombinepolicy": get_paircombinepolicy(policyparams),
+            "playernamepolicy": get_playernamepolicy(policyparams),
+            "clubnamepolicy": get_clubnamepolicy(),
+            "countrynamepolicy": countrynamepolicy,
+            "matchselectionparams": variant.matchselectionparams,
+            "matchesinfeedselectionparams": matchesinfeedselectionparams,
+        }
+    )
+    # Render exactly like FastAPI would render the dict returned by an endpoint:
+    return RenderedFeed(
+        body=bytes(JSONResponse(FeedDictAdapter.dump_python(feed, mode="json")).body),
+        nummatches=feed["nummatches"],
+    )
+
+
+def prerender_matches_feeds(
+    tournament: SquoreTournament,
+    configfile: CachedFile[Config],
+    variants: Iterable[FeedVariant],
+    commandlineparams: CommandLineParams,
+) -> list[tuple[tuple[Hashable, ...], RenderedFeed]]:
+    try:
+        config, configversion = configfile.get_versioned()
+
+    except FileNotFoundError:
+        config, configversion = {}, None
+
+    except ValueError as err:
+        logger.warning(f"Not pre-rendering feeds, as config cannot be loaded: {err}")
+        return []
+
+    ret: list[tuple[tuple[Hashable, ...], RenderedFeed]] = []
+    for variant in variants:
+        originconfig = _config_for_origin(config, variant.origin)
+        # Devices request the feed for their court, or without a court, if they
+        # are not in the devmap:
+        for court in [*sorted(tournament.get_courts()), None]:
+            feedparams = MatchesInFeedSelectionParams(
+                **commandlineparams.model_dump()
+                | ({"court": court.id} if court is not None else {})
+            )
+            ret.append(
+                (
+                    _feed_cache_key(tournament, configversion, variant, feedparams),
+                    render_matches_feed(tournament, originconfig, variant, feedparams),
+                )
+            )
+
+    return ret
+
+
 # }}}
 
 # {{{ Request related dependencies
@@ -307,125 +514,147 @@ def get_url(request: Request) -> URL:
 # {{{ Setting, config, devmap
 
 
-def get_settings_path(request: Request) -> pathlib.Path | Never:
-    try:
-        return cast(pathlib.Path, request.app.state.squore["settings"])
+def load_settings(f: IO[bytes]) -> dict[str, Any]:
+    settings: dict[str, Any] = json.load(f)
+    settings.pop("_COMMENT", None)
+    return settings
 
-    except (AttributeError, KeyError) as err:
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="App state does not include squore.settings",
-        ) from err
 
+def load_config(f: IO[bytes]) -> Config | Never:
+    tomlconfig = tomllib.load(f)
+    config = ConfigValidator.validate_python(tomlconfig, strict=True)
 
-def get_config_path(request: Request) -> pathlib.Path | Never:
-    try:
-        return cast(pathlib.Path, request.app.state.squore["config"])
+    for key in tomlconfig:
+        if key not in config:
+            raise ValueError(f"Invalid key in config file: {key}")
 
-    except (AttributeError, KeyError) as err:
-        raise HTTPException(
-            status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="App state does not include squore.config",
-        ) from err
+    return config
 
 
-def get_devmap_path(request: Request) -> pathlib.Path | Never:
+def make_file_reload_callback(
+    cachedfile: CachedFile[Any], *, on_reload: Iterable[Callable[[], None]] = ()
+) -> CallbackType:
+    async def callback() -> StateType:
+        cachedfile.reload()
+        for fn in on_reload:
+            fn()
+        return MappingProxyType({})
+
+    return callback
+
+
+def get_squore_state(request: Request, key: str) -> Any | Never:
     try:
-        return cast(pathlib.Path, request.app.state.squore["devmap"])
+        return request.app.state.squore[key]
 
     except (AttributeError, KeyError) as err:
         raise HTTPException(
             status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="App state does not include squore.devmap",
+            detail=f"App state does not include squore.{key}",
         ) from err
 
 
-def _relative_to_absolute_urls(urls_per_line: str, myurl: URL) -> str:
+def get_squore_file(request: Request, key: str) -> CachedFile[Any] | Never:
+    return cast(CachedFile[Any], get_squore_state(request, key))
+
+
+def _raise_for_load_error(cachedfile: CachedFile[Any], err: ValueError) -> Never:
+    raise HTTPException(
+        status_code=HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=f"Cannot load {cachedfile.path}: {err}",
+    ) from err
+
+
+@functools.lru_cache(maxsize=64)
+def _relative_to_absolute_urls(urls_per_line: str, origin: URL) -> str:
     urls: list[str] = []
     for urlstr in urls_per_line.splitlines():
         if URL(urlstr).is_absolute():
             urls.append(urlstr)
             continue
 
-        urls.append(str(myurl.with_path(urlstr, encoded=True)))
+        urls.append(str(origin.with_path(urlstr, encoded=True)))
     return "\n".join(urls)
 
 
 def get_settings(
-    path: Annotated[pathlib.Path, Depends(get_settings_path)],
+    request: Request,
     myurl: Annotated[URL, Depends(get_url)],
 ) -> dict[str, Any] | Never:
+    cachedfile = get_squore_file(request, "settings")
     try:
-        with open(path, "rb") as f:
-            # TODO:cache. There should be a file-like class that caches the output,
-            # ideally even the output of a callable on the data, and on every
-            # subsequent access, check the original file's mtime to decide whether
-            # to serve the cache, or relaod.
-
-            settings: dict[str, Any] = json.load(f)
-
-            for setting in ("FlagsURLs",):
-                if setting in settings:
-                    settings[setting] = _relative_to_absolute_urls(
-                        settings[setting], myurl
-                    )
-            settings.pop("_COMMENT", None)
-            return settings
+        loaded = cast(dict[str, Any], cachedfile.get())
 
     except FileNotFoundError as err:
         raise HTTPException(
             status_code=HTTP_404_NOT_FOUND,
-            detail=f"Squore settings file not found at {path}",
+            detail=f"Squore settings file not found at {err.filename}",
         ) from err
 
+    except ValueError as err:
+        _raise_for_load_error(cachedfile, err)
 
-def get_config(
-    path: Annotated[pathlib.Path, Depends(get_config_path)],
-    myurl: Annotated[URL, Depends(get_url)],
-) -> Config | Never:
-    config: Config = {}
-
-    try:
-        with open(path, "rb") as f:
-            # TODO:cache. There should be a file-like class that caches the output,
-            # ideally even the output of a callable on the data, and on every
-            # subsequent access, check the original file's mtime to decide whether
-            # to serve the cache, or relaod.
-            tomlconfig = tomllib.load(f)
-
-    except FileNotFoundError:
-        logger.warning(f"Squore config file not found at {path}, ignoring…")
+    # The cached settings are shared between requests, which modify them:
+    settings = loaded.copy()
+    for setting in ("FlagsURLs",):
+        if setting in settings:
+            settings[setting] = _relative_to_absolute_urls(
+                settings[setting], myurl.origin()
+            )
 
-    else:
-        config = ConfigValidator.validate_python(tomlconfig, strict=True)
+    return settings
 
-        for key in tomlconfig:
-            if key not in config:
-                raise HTTPException(
-                    status_code=HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Invalid key in config file {path}: {key}",
-                )
 
+def _config_for_origin(config: Config, origin: URL) -> Config:
+    # The cached config is shared between requests, so must not be modified:
+    config = config.copy()
     for setting in ("PostResult",):
         if setting in config:
-            config[setting] = _relative_to_absolute_urls(config[setting], myurl)
+            config[setting] = _relative_to_absolute_urls(config[setting], origin)
 
     return config
 
 
-def get_dev_map(
-    path: Annotated[pathlib.Path, Depends(get_devmap_path)],
-) -> DeviceCourtMap:
+def get_versioned_config(
+    request: Request,
+    myurl: Annotated[URL, Depends(get_url)],
+) -> tuple[Config, str | None] | Never:
+    cachedfile = get_squore_file(request, "config")
     try:
-        with open(path, "rb") as f:
-            return DeviceCourtMap(f)
+        config, version = cast(tuple[Config, str | None], cachedfile.get_versioned())
 
-    except FileNotFoundError:
+    except FileNotFoundError as err:
+        logger.warning(f"Squore config file not found at {err.filename}, ignoring…")
+        return {}, None
+
+    except ValueError as err:
+        _raise_for_load_error(cachedfile, err)
+
+    return _config_for_origin(config, myurl.origin()), version
+
+
+def get_config(
+    versioned_config: Annotated[
+        tuple[Config, str | None], Depends(get_versioned_config)
+    ],
+) -> Config:
+    return versioned_config[0]
+
+
+def get_dev_map(request: Request) -> DeviceCourtMap | Never:
+    cachedfile = get_squore_file(request, "devmap")
+    try:
+        return cast(DeviceCourtMap, cachedfile.get())
+
+    except FileNotFoundError as err:
         logger.warning(
-            f"Squore device to court map not found at {path} "
+            f"Squore device to court map not found at {err.filename} "
             f"(cwd: {pathlib.Path.cwd()}), ignoring…"
         )
 
+    except ValueError as err:
+        _raise_for_load_error(cachedfile, err)
+
     return DeviceCourtMap()
 
 
@@ -436,10 +665,13 @@ def get_dev_map(
 
 def get_court_for_dev(
     dev_map: Annotated[DeviceCourtMap, Depends(get_dev_map)],
+    tournament: Annotated[SquoreTournament, Depends(get_tournament)],
     courts: Annotated[list[Court], Depends(get_courts)],
     clientip: Annotated[str, Depends(get_remote)],
 ) -> Court | None:
-    return dev_map.find_court_for_ip(clientip, courts=courts)
+    return dev_map.find_court_for_ip(
+        clientip, courts=courts, courts_version=tournament.version
+    )
 
 
 def get_mirror_for_dev(
@@ -457,6 +689,113 @@ def get_mirror_for_dev(
     return None
 
 
+# }}}
+
+# {{{ Conditional requests
+
+
+def get_squore_file_versions(request: Request) -> tuple[str | None, ...]:
+    versions: list[str | None] = []
+    for key in ("settings", "config", "devmap"):
+        cachedfile = get_squore_file(request, key)
+        # Revalidate the file, as the response might not get to do so:
+        with contextlib.suppress(FileNotFoundError, ValueError):
+            cachedfile.get()
+        versions.append(cachedfile.version)
+    return tuple(versions)
+
+
+def get_etag(
+    request: Request,
+    myurl: Annotated[URL, Depends(get_url)],
+    tournament: Annotated[SquoreTournament, Depends(get_tournament)],
+    court_for_dev: Annotated[Court | None, Depends(get_court_for_dev)],
+    mirror_for_dev: Annotated[str | None, Depends(get_mirror_for_dev)],
+    commandlineparams: Annotated[CommandLineParams, Depends(get_commandlineparams)],
+) -> str:
+    # Rather err on the side of including too much, e.g. the settings version for
+    # /players: responses only stay the same for as long as none of these change
+    return make_etag(
+        str(myurl.origin()),
+        myurl.path,
+        tuple(sorted((k, v) for k, v in myurl.query.items() if k != LONGPOLL_PARAM)),
+        tournament.version,
+        get_squore_file_versions(request),
+        court_for_dev.id if court_for_dev is not None else None,
+        mirror_for_dev,
+        repr(commandlineparams),
+    )
+
+
+def _etag_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "no-cache"}
+
+
+def check_if_none_match(
+    request: Request,
+    response: Response,
+    remote: Annotated[str, Depends(get_remote)],
+    etag: Annotated[str, Depends(get_etag)],
+) -> str | Never:
+    # Endpoints must depend on this first, so that a 304 response is sent
+    # before any of the other dependencies get to do their work:
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        logger.debug(f"Not modified: {request.url.path} requested by {remote}")
+        raise HTTPException(
+            status_code=HTTP_304_NOT_MODIFIED, headers=_etag_headers(etag)
+        )
+
+    response.headers.update(_etag_headers(etag))
+    return etag
+
+
+def get_change_notifier(request: Request) -> ChangeNotifier:
+    return cast(ChangeNotifier, get_squore_state(request, "notifier"))
+
+
+def _compute_etag(request: Request) -> str | Never:
+    # The same as resolving get_etag, but outside of FastAPI's dependency
+    # resolution, which caches results for the duration of the request:
+    tournament = get_tournament(request)
+    dev_map = get_dev_map(request)
+    clientip = cast(str, get_remote(request))
+    courts = cast(list[Court], get_courts(tournament))
+    return get_etag(
+        request,
+        get_url(request),
+        tournament,
+        get_court_for_dev(dev_map, tournament, courts, clientip),
+        get_mirror_for_dev(dev_map, clientip),
+        get_commandlineparams(request),
+    )
+
+
+async def wait_for_change(
+    request: Request,
+    remote: Annotated[str, Depends(get_remote)],
+    notifier: Annotated[ChangeNotifier, Depends(get_change_notifier)],
+    wait: Annotated[
+        float | None, Query(alias=LONGPOLL_PARAM, ge=0, le=LONGPOLL_MAX_WAIT)
+    ] = None,
+) -> None:
+    # Long-polling: if the client is up-to-date, hold the request until something
+    # changes, or the wait times out. Endpoints must depend on this before
+    # anything else, so that all other dependencies are resolved afterwards:
+    if not wait or (if_none_match := request.headers.get("If-None-Match")) is None:
+        return
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + wait
+    while (remaining := deadline - loop.time()) > 0:
+        event = notifier.event
+        if not etag_matches(if_none_match, _compute_etag(request)):
+            return
+
+        logger.debug(f"Holding {request.url.path} for {remote} for {remaining:.1f}s")
+        if not await notifier.wait(event, remaining):
+            break
+
+
 # }}}
 
 # {{{ Per-court feed data
@@ -536,28 +875,47 @@ def get_feed_data_for_all_courts(
 
 
 squoreapp = FastAPI()
+# Compresses responses not compressed already, i.e. all but the matches feed:
+squoreapp.add_middleware(
+    GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE, compresslevel=GZIP_LEVEL
+)
 
 # {{{ GET /matches
 
 
-def get_matches_feed_dict(
-    tournament: Annotated[SquoreTournament, Depends(get_tournament)],
-    config: Annotated[Config, Depends(get_config)],
-    playernamepolicy: Annotated[PlayerNamePolicy, Depends(get_playernamepolicy)],
-    paircombinepolicy: Annotated[PairCombinePolicy, Depends(get_paircombinepolicy)],
-    countrynamepolicy: Annotated[CountryNamePolicy, Depends(get_countrynamepolicy)],
-    clubnamepolicy: Annotated[ClubNamePolicy, Depends(get_clubnamepolicy)],
-    courtnamepolicy: Annotated[CourtNamePolicy, Depends(get_courtnamepolicy)],
+def get_feed_variant(
+    myurl: Annotated[URL, Depends(get_url)],
+    matchpolicyparams: Annotated[MatchesPolicyParams, Depends(get_matchpolicyparams)],
     matchselectionparams: Annotated[
         MatchSelectionParamsDefaultsOnlyReady, Depends(get_matchselectionparams)
     ],
+    feedvariants: Annotated[FeedVariants, Depends(get_feed_variants)],
+) -> FeedVariant:
+    variant = FeedVariant(
+        origin=myurl.origin(),
+        matchpolicyparams=matchpolicyparams,
+        matchselectionparams=matchselectionparams,
+    )
+    # Remember the variants requested, to pre-render them on the next update:
+    feedvariants.put(variant.key, variant)
+    return variant
+
+
+async def get_matches_feed(
+    tournament: Annotated[SquoreTournament, Depends(get_tournament)],
+    versioned_config: Annotated[
+        tuple[Config, str | None], Depends(get_versioned_config)
+    ],
+    variant: Annotated[FeedVariant, Depends(get_feed_variant)],
     matchesinfeedselectionparams: Annotated[
         MatchesInFeedSelectionParams, Depends(get_matchesinfeedselectionparams)
     ],
     court_for_dev: Annotated[Court | None, Depends(get_court_for_dev)],
     squoredev: Annotated[SquoreDevQueryParams, Depends(get_squoredevqueryparams)],
     commandlineparams: Annotated[CommandLineParams, Depends(get_commandlineparams)],
-) -> dict[str, Any]:
+    feedcache: Annotated[FeedCache, Depends(get_feed_cache)],
+    feedflights: Annotated[FeedFlights, Depends(get_feed_flights)],
+) -> RenderedFeed:
     if matchesinfeedselectionparams.court is None and court_for_dev:
         matchesinfeedselectionparams.court = court_for_dev.id
         logger.info(
@@ -569,47 +927,51 @@ def get_matches_feed_dict(
         | matchesinfeedselectionparams.model_dump(exclude_defaults=True)
     )
 
-    if not countrynamepolicy.use_country_code:
-        logger.warning("Overriding CountryNamePolicy.use_country_code = True")
-
-    countrynamepolicy = dataclasses.replace(
-        countrynamepolicy, use_country_code=True, titlecase=False
+    config, configversion = versioned_config
+    key = _feed_cache_key(
+        tournament, configversion, variant, matchesinfeedselectionparams
     )
+    if (rendered := feedcache.get(key)) is not None:
+        logger.debug(f"Serving MatchesFeed from cache: {feedcache!r}")
+        return rendered
 
-    logger.info(
-        f"Making MatchesFeed ({matchselectionparams}, {matchesinfeedselectionparams})"
-    )
+    def render() -> RenderedFeed:
+        rendered = render_matches_feed(
+            tournament, config, variant, matchesinfeedselectionparams
+        )
+        feedcache.put(key, rendered)
+        return rendered
 
-    return MatchesFeed(tournament=tournament, config=config).model_dump(
-        context={
-            "courtnamepolicy": courtnamepolicy,
-            "paircombinepolicy": paircombinepolicy,
-            "playernamepolicy": playernamepolicy,
-            "clubnamepolicy": clubnamepolicy,
-            "countrynamepolicy": countrynamepolicy,
-            "matchselectionparams": matchselectionparams,
-            "matchesinfeedselectionparams": matchesinfeedselectionparams,
-        }
-    )
+    # Devices tend to poll at the same time after an update, and identical
+    # requests should then share a single rendering, off the event loop:
+    return await feedflights.run(key, lambda: asyncio.to_thread(render))
 
 
-@squoreapp.get("/matches")
+@squoreapp.get("/matches", response_class=JSONResponse)
 async def matches(
+    _: Annotated[None, Depends(wait_for_change)],
+    etag: Annotated[str, Depends(check_if_none_match)],
     remote: Annotated[str, Depends(get_remote)],
     matchpolicyparams: Annotated[MatchesPolicyParams, Depends(get_matchpolicyparams)],
     matchfeedparams: Annotated[
         MatchesInFeedSelectionParams, Depends(get_matchesinfeedselectionparams)
     ],
-    matches_feed_dict: Annotated[dict[str, Any], Depends(get_matches_feed_dict)],
-) -> dict[str, Any]:
+    matches_feed: Annotated[RenderedFeed, Depends(get_matches_feed)],
+    accept_encoding: Annotated[str | None, Header()] = None,
+) -> Response:
     logger.info(
-        f"Returning {matches_feed_dict['nummatches']} matches in response to "
+        f"Returning {matches_feed.nummatches} matches in response to "
         f"request from {remote} "
         f"(policyparams=({matchpolicyparams}) feedparams=({matchfeedparams}))"
     )
     # we cannot return a MatchesFeed as there is currently no way to pass data into the
     # model_dump context with FastAPI: https://github.com/fastapi/fastapi/pull/13475
-    return matches_feed_dict
+    return encoded_response(
+        matches_feed.encoded,
+        accept_encoding,
+        media_type="application/json",
+        headers=_etag_headers(etag),
+    )
 
 
 # }}}
@@ -619,6 +981,7 @@ async def matches(
 
 @squoreapp.get("/players")
 async def players(
+    etag: Annotated[str, Depends(check_if_none_match)],
     remote: Annotated[str, Depends(get_remote)],
     policyparams: Annotated[PlayersPolicyParams, Query()],
     players: Annotated[list[dict[str, Any]], Depends(get_players_list)],
@@ -627,7 +990,9 @@ async def players(
         f"Returning {len(players)} players in response to request from {remote} "
         f"({policyparams})"
     )
-    return PlainTextResponse("\n".join([p["name"] for p in players]))
+    return PlainTextResponse(
+        "\n".join([p["name"] for p in players]), headers=_etag_headers(etag)
+    )
 
 
 # }}}
@@ -637,6 +1002,7 @@ async def players(
 
 @squoreapp.get("/tournament")
 async def tournament(
+    etag: Annotated[str, Depends(check_if_none_match)],
     remote: Annotated[str, Depends(get_remote)],
     tournament: Annotated[SquoreTournament, Depends(get_tournament)],
 ) -> SquoreTournament:
@@ -657,6 +1023,7 @@ class CourtInfo(BaseModel):
 
 @squoreapp.get("/courts")
 async def courts(
+    etag: Annotated[str, Depends(check_if_none_match)],
     remote: Annotated[str, Depends(get_remote)],
     courts: Annotated[list[Court], Depends(get_courts)],
 ) -> list[Court]:
@@ -671,6 +1038,7 @@ async def courts(
 
 @squoreapp.get("/draws")
 async def draws(
+    etag: Annotated[str, Depends(check_if_none_match)],
     remote: Annotated[str, Depends(get_remote)],
     draws: Annotated[list[Draw], Depends(get_draws)],
 ) -> list[Draw]:
@@ -685,7 +1053,9 @@ async def draws(
 
 @squoreapp.get("/feeds")
 async def feeds(
+    etag: Annotated[str, Depends(check_if_none_match)],
     remote: Annotated[str, Depends(get_remote)],
+    variant: Annotated[FeedVariant, Depends(get_feed_variant)],
     policyparams: Annotated[MatchesPolicyParams, Query()],
     court_feeds: Annotated[list[CourtFeedData], Depends(get_feed_data_for_all_courts)],
 ) -> list[CourtFeedData]:
@@ -720,8 +1090,7 @@ async def init(
 # {{{ GET /settings
 
 
-@squoreapp.get("/settings")
-async def settings(
+def get_device_settings(
     myurl: Annotated[URL, Depends(get_url)],
     remote: Annotated[str, Depends(get_remote)],
     settings: Annotated[dict[str, Any], Depends(get_settings)],
@@ -731,12 +1100,6 @@ async def settings(
     squoredev: Annotated[SquoreDevQueryParams, Depends(get_squoredevqueryparams)],
     commandlineparams: Annotated[CommandLineParams, Depends(get_commandlineparams)],
 ) -> dict[str, Any]:
-    logger.info(
-        f"App settings request from remote {remote} "
-        f"for device {squoredev.device_id or '(no ID)'} "
-        f"(ip={squoredev.ip}, cc={squoredev.cc}, v={squoredev.version})"
-    )
-
     # Data herein is included with every PostResult/MQTT packet:
     settings["customData"] = {}
 
@@ -806,6 +1169,69 @@ async def settings(
     return settings
 
 
+@squoreapp.get("/settings")
+async def settings(
+    etag: Annotated[str, Depends(check_if_none_match)],
+    remote: Annotated[str, Depends(get_remote)],
+    squoredev: Annotated[SquoreDevQueryParams, Depends(get_squoredevqueryparams)],
+    settings: Annotated[dict[str, Any], Depends(get_device_settings)],
+) -> dict[str, Any]:
+    logger.info(
+        f"App settings request from remote {remote} "
+        f"for device {squoredev.device_id or '(no ID)'} "
+        f"(ip={squoredev.ip}, cc={squoredev.cc}, v={squoredev.version})"
+    )
+    return settings
+
+
+# }}}
+
+# {{{ GET /bundle
+
+
+def render_bundle(
+    settings: dict[str, Any],
+    court_feeds: list[CourtFeedData],
+    matches_feed: RenderedFeed,
+    players: list[dict[str, Any]],
+) -> bytes:
+    rest = JSONResponse(
+        {
+            "settings": settings,
+            "feeds": [courtfeed.model_dump() for courtfeed in court_feeds],
+            "players": [p["name"] for p in players],
+        }
+    ).body
+    # The matches feed is already rendered, and is spliced in as-is, rather than
+    # parsed only to be serialised again:
+    return b'{"matches":' + matches_feed.body + b"," + bytes(rest[1:])
+
+
+@squoreapp.get("/bundle")
+async def bundle(
+    etag: Annotated[str, Depends(check_if_none_match)],
+    remote: Annotated[str, Depends(get_remote)],
+    squoredev: Annotated[SquoreDevQueryParams, Depends(get_squoredevqueryparams)],
+    settings: Annotated[dict[str, Any], Depends(get_device_settings)],
+    court_feeds: Annotated[list[CourtFeedData], Depends(get_feed_data_for_all_courts)],
+    matches_feed: Annotated[RenderedFeed, Depends(get_matches_feed)],
+    players: Annotated[list[dict[str, Any]], Depends(get_players_list)],
+) -> Response:
+    # Everything a device needs to get going in a single round-trip. FastAPI
+    # resolves each dependency only once per request, so the tournament, config
+    # and devmap lookups are shared between the parts:
+    logger.info(
+        f"Returning bundle with {len(court_feeds)} feeds, "
+        f"{matches_feed.nummatches} matches and {len(players)} players "
+        f"for device {squoredev.device_id or '(no ID)'} at {remote}"
+    )
+    return Response(
+        render_bundle(settings, court_feeds, matches_feed, players),
+        media_type="application/json",
+        headers=_etag_headers(etag),
+    )
+
+
 # }}}
 
 # {{{ Deprecated routes
@@ -856,9 +1282,6 @@ async def setup_for_squore(
         )
 
     squoreapp.state.squore = {
-        "settings": settings_json,
-        "config": config_toml,
-        "devmap": devmap_toml,
         "commandlineparams": CommandLineParams(
             only_this_court=only_this_court,
             max_matches_per_court=max_matches_per_court,
@@ -866,6 +1289,46 @@ async def setup_for_squore(
             include_feeds=include_feeds,
         ),
     }
+
+    # Settings, config, and the devmap are kept in memory, and reloaded when the
+    # files change. Revalidation by mtime catches changes the watcher missed, or
+    # changes to files in directories that did not exist, and cannot be watched:
+    squorefiles = (
+        ("settings", settings_json, load_settings),
+        ("config", config_toml, load_config),
+        ("devmap", devmap_toml, DeviceCourtMap),
+    )
+    watchable = [path for _, path, _ in squorefiles if path.parent.is_dir()]
+    watcher = FileWatcher(watchable[0]) if watchable else None
+    squoreapp.state.squore["watcher"] = watcher
+    feedcache: FeedCache = LRUCache(maxsize=FEED_CACHE_SIZE)
+    squoreapp.state.squore["feedcache"] = feedcache
+    feedvariants: FeedVariants = LRUCache(maxsize=FEED_VARIANTS_SIZE)
+    squoreapp.state.squore["feedvariants"] = feedvariants
+    squoreapp.state.squore["feedflights"] = SingleFlight()
+    notifier = ChangeNotifier()
+    squoreapp.state.squore["notifier"] = notifier
+    for key, path, loader in squorefiles:
+        cachedfile = CachedFile(
+            path, loader, revalidate_interval=SQUORE_FILES_REVALIDATE_INTERVAL
+        )
+        squoreapp.state.squore[key] = cachedfile
+        cachedfile.reload()
+        if watcher is not None and path in watchable:
+            watcher.add_path(path)
+            watcher.register_callback(
+                make_file_reload_callback(
+                    cachedfile,
+                    # The feeds include the config:
+                    on_reload=(feedcache.clear, notifier.notify)
+                    if key == "config"
+                    else (notifier.notify,),
+                ),
+                path=path,
+            )
+        else:
+            logger.warning(f"Cannot watch {path} for changes, directory missing")
+
     squoreapp.mount(
         "/flags",
         StaticFiles(directory=assets_path / "flags", html=True),
@@ -878,13 +1341,45 @@ async def setup_for_squore(
 
     async def callback(tournament: Tournament) -> None:
         logger.info("Received new tournament data, making MatchesFeed")
-        squoreapp.state.tournament = (
-            sqt := SquoreTournament.from_tournament(tournament)
+        sqt = SquoreTournament.from_tournament(tournament)
+        # Names are cached by content, but those of the old tournament would
+        # only take up space from now on:
+        clear_name_cache()
+        # Until the feeds are rendered, requests are still served from the old
+        # tournament and feeds:
+        rendered = await asyncio.to_thread(
+            prerender_matches_feeds,
+            sqt,
+            squoreapp.state.squore["config"],
+            [variant for _, variant in feedvariants.items()],
+            squoreapp.state.squore["commandlineparams"],
         )
+        logger.info(f"Pre-rendered {len(rendered)} feeds, old cache: {feedcache!r}")
+        # All pre-rendered feeds must fit, with as much room again for feeds
+        # rendered on request, or they would be evicted before they are used:
+        if (cachesize := max(FEED_CACHE_SIZE, 2 * len(rendered))) != feedcache.maxsize:
+            logger.info(f"Resizing feed cache to {cachesize} feeds")
+            feedcache.resize(cachesize)
+        # There must not be an await between these, so that requests see either
+        # the old tournament and feeds, or the new ones:
+        feedcache.replace(rendered)
+        squoreapp.state.tournament = sqt
         clictx.itc.set("sqtournament", sqt)
+        notifier.notify()
 
     updates_gen = cast(AsyncGenerator[Tournament], clictx.itc.updates("tournament"))
-    yield react_to_data_update(updates_gen, callback=callback)
+
+    async def squore_tasks() -> None:
+        async with asyncio.TaskGroup() as tg:
+            if watcher is not None:
+                tg.create_task(watcher.reactor_task(), name="Squore file watcher")
+            tg.create_task(
+                react_to_data_update(updates_gen, callback=callback),
+                name="Squore tournament updates",
+            )
+
+    async with watcher or contextlib.nullcontext():
+        yield squore_tasks()
 
 
 @plugin
@@ -22,12 +22,9 @@ async def tournament_model_dump_json(
     indent: int | None = None,
 ) -> None:
     logger.info("Tournament changed, printing JSON to stdout")
-    data = tournament.model_dump_json(
-        indent=indent,
-        context={
-            "matchselectionparams": MatchSelectionParams(include_not_ready=True),
-        },
-    )
+    data = tournament.dump_json(
+        MatchSelectionParams(include_not_ready=True), indent=indent
+    ).decode()
     nonblocking_write(data + "\n", file=sys.stdout)
 
 
@@ -62,6 +62,7 @@ async def tp_source(
     session: Session,
     *,
     no_fire_on_startup: bool = False,
+    load_timeout: float | None = None,
 ) -> PluginLifespan:
     if clictx.itc.knows_about("tpdata"):
         raise click.ClickException("Another TP source is already registered")
@@ -71,13 +72,23 @@ async def tp_source(
         try:
             session.expire_all()
             tournament = await load_tournament(session)
-            clictx.itc.set("tournament", tournament)
-            return MappingProxyType({})
 
         except InvalidDrawType as err:
             raise click.ClickException(err.args[0]) from err
 
-    watcher = FileWatcher(tp_file, fire_once_asap=not no_fire_on_startup)
+        if watcher.superseded:
+            logger.info("TP file changed while loading, discarding stale tournament…")
+
+        else:
+            clictx.itc.set("tournament", tournament)
+
+        return MappingProxyType({})
+
+    # Large TP files can take a while to load, which must not get cancelled by
+    # the FileWatcher's default callback timeout:
+    watcher = FileWatcher(
+        tp_file, fire_once_asap=not no_fire_on_startup, callback_timeout=load_timeout
+    )
     clictx.watcher = watcher
     watcher.register_callback(callback)
     async with watcher():
@@ -138,6 +149,13 @@ def make_engine(
     is_flag=True,
     help="Do not load data ASAP on startup, only on change",
 )
+@click.option(
+    "--load-timeout",
+    metavar="SECONDS",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Give up loading the TP file after this long (default: never)",
+)
 # TODO: how to use pollfreq? See https://github.com/gorakhargosh/watchdog/issues/1116
 # @click.option(
 #     "--pollfreq",
@@ -155,6 +173,7 @@ async def tp(
     user: str,
     password: str,
     no_fire_on_startup: bool,
+    load_timeout: float | None,
     # pollfreq: int,
 ) -> PluginLifespan:
     """Obtain match and player data from a TP file (or SQLite)"""
@@ -172,6 +191,10 @@ async def tp(
 
     with Session(engine) as session:
         async with tp_source(
-            clictx, tp_file, session, no_fire_on_startup=no_fire_on_startup
+            clictx,
+            tp_file,
+            session,
+            no_fire_on_startup=no_fire_on_startup,
+            load_timeout=load_timeout,
         ) as task:
             yield task
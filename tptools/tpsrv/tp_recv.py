@@ -1,65 +1,260 @@
+import asyncio
 import logging
+from collections import deque
+from collections.abc import AsyncGenerator
 from contextlib import asynccontextmanager
-from typing import Annotated, Any
+from typing import Annotated, Any, cast
 
 import click
-from click_async_plugins import PluginLifespan, plugin
-from fastapi import Depends, FastAPI, HTTPException, Request
+from click_async_plugins import PluginLifespan, plugin, react_to_data_update
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from httpx import URL
-from starlette.status import HTTP_508_LOOP_DETECTED
+from starlette.status import HTTP_409_CONFLICT, HTTP_508_LOOP_DETECTED
 
 from tptools import Tournament
+from tptools.cache import LRUCache
+from tptools.delta import TournamentDelta, TournamentDump
 
 from .util import (
+    COMPRESS_MIN_SIZE,
+    CONTENT_CODINGS,
+    GZIP_LEVEL,
+    ChangeNotifier,
     CliContext,
+    EncodedBody,
     PostData,
     bootstrap_tournament_from_url,
+    encoded_response,
     get_clictx,
     get_peer,
     get_tournament,
     pass_clictx,
+    read_request_body,
     validate_url,
 )
 
 TPRECV_PATH_VERSION = "v1"
 API_MOUNTPOINT = "/tptools"
+STREAM_HISTORY_SIZE = 64
+STREAM_KEEPALIVE_INTERVAL = 15.0
+BODY_CACHE_SIZE = 4
 
 logger = logging.getLogger(__name__)
 
 
 recvapp = FastAPI()
+# Compresses responses not compressed already, which excludes the event stream:
+recvapp.add_middleware(
+    GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE, compresslevel=GZIP_LEVEL
+)
+
+# The tournament JSON per version, for GET requests, compressed as needed:
+_bodies: LRUCache[str, EncodedBody] = LRUCache(BODY_CACHE_SIZE)
+
+
+# {{{ Tournament stream
+
+
+def _sse_event(event: str, data: str, id: str | None = None) -> bytes:
+    lines = [f"event: {event}"]
+    if id is not None:
+        lines.append(f"id: {id}")
+    lines.extend(f"data: {line}" for line in data.splitlines())
+    return ("\n".join(lines) + "\n\n").encode()
+
+
+class TournamentStream:
+    # Keeps the current tournament and the deltas that led up to it, so that
+    # clients can be sent a snapshot once and deltas thereafter, and clients
+    # that reconnect can resume from the last version they saw:
+    def __init__(self, history_size: int = STREAM_HISTORY_SIZE) -> None:
+        self._tournament: Tournament | None = None
+        self._dump: TournamentDump = {}
+        self._history: deque[TournamentDelta] = deque(maxlen=history_size)
+        self._notifier = ChangeNotifier()
+
+    def __repr__(self) -> str:
+        return (
+            f"{self.__class__.__name__}(version={self.version}, "
+            f"history={len(self._history)})"
+        )
+
+    @property
+    def tournament(self) -> Tournament | None:
+        return self._tournament
+
+    @property
+    def version(self) -> str | None:
+        return None if self._tournament is None else self._tournament.version
+
+    @property
+    def notifier(self) -> ChangeNotifier:
+        return self._notifier
+
+    def publish(
+        self, tournament: Tournament, dump: TournamentDump | None = None
+    ) -> TournamentDelta | None:
+        if dump is None:
+            dump = TournamentDelta.dump(tournament)
+
+        delta = None
+        if self._tournament is not None:
+            if tournament.version == self._tournament.version:
+                return None
+            delta = TournamentDelta.from_dumps(
+                self._tournament.version, self._dump, tournament.version, dump
+            )
+            self._history.append(delta)
+            logger.debug(f"Publishing tournament delta {delta}")
+
+        self._tournament, self._dump = tournament, dump
+        self._notifier.notify()
+        return delta
+
+    def deltas_since(self, version: str | None) -> list[TournamentDelta] | None:
+        # None means that the version is unknown and a snapshot is needed:
+        if version is None or self._tournament is None:
+            return None
+
+        if version == self._tournament.version:
+            return []
+
+        for i, delta in enumerate(self._history):
+            if delta.base == version:
+                return list(self._history)[i:]
+
+        return None
+
+    async def events(
+        self,
+        since: str | None = None,
+        *,
+        keepalive: float = STREAM_KEEPALIVE_INTERVAL,
+    ) -> AsyncGenerator[bytes]:
+        version = since
+        while True:
+            # Get hold of the event before looking at the state, so that
+            # a change in between is not missed:
+            event = self._notifier.event
+            if version != self.version:
+                # Taken before yielding, as the state may change meanwhile:
+                tournament, deltas = self._tournament, self.deltas_since(version)
+                if deltas is not None:
+                    for delta in deltas:
+                        yield _sse_event(
+                            "delta", delta.model_dump_json(), delta.version
+                        )
+                elif tournament is not None:
+                    yield _sse_event(
+                        "snapshot", tournament.dump_json().decode(), tournament.version
+                    )
+                version = None if tournament is None else tournament.version
+
+            if not await self._notifier.wait(event, keepalive):
+                yield b": keepalive\n\n"
+
+
+def get_tournament_stream(request: Request) -> TournamentStream:
+    return cast(TournamentStream, request.app.state.stream)
+
+
+# }}}
+
+
+def _check_cookie(data: PostData[Any], clictx: CliContext) -> None:
+    if data.cookie == hash(clictx):
+        raise HTTPException(
+            status_code=HTTP_508_LOOP_DETECTED,
+            detail="Won't receive my own data",
+        )
 
 
-@recvapp.post("/tournament")
+def _accept_encoding(response: Response) -> None:
+    # Lets the sender know it may compress what it posts (RFC 7694):
+    response.headers["Accept-Encoding"] = ", ".join(CONTENT_CODINGS)
+
+
+@recvapp.post("/tournament", dependencies=[Depends(_accept_encoding)])
 async def receive_tournament(
     request: Request,
     peer: Annotated[str, Depends(get_peer)],
     clictx: Annotated[CliContext, Depends(get_clictx)],
 ) -> dict[str, Any]:
-    body = await request.body()
+    body = await read_request_body(request)
     data = PostData[Tournament].model_validate_json(body)
-    if data.cookie == hash(clictx):
-        raise HTTPException(
-            status_code=HTTP_508_LOOP_DETECTED,
-            detail="Won't receive my own data",
-        )
+    _check_cookie(data, clictx)
     tournament = data.data
     logger.info(f"Received tournament from tptools at {peer}: {tournament}")
     clictx.itc.set("tournament", tournament)
-    return {"status": f"Received tournament: {tournament}"}
+    # The version lets the sender know what to base deltas on:
+    return {
+        "status": f"Received tournament: {tournament}",
+        "version": tournament.version,
+    }
 
 
-@recvapp.get("/tournament")
+@recvapp.post("/tournament/delta", dependencies=[Depends(_accept_encoding)])
+async def receive_tournament_delta(
+    request: Request,
+    peer: Annotated[str, Depends(get_peer)],
+    clictx: Annotated[CliContext, Depends(get_clictx)],
+) -> dict[str, Any]:
+    body = await read_request_body(request)
+    data = PostData[TournamentDelta].model_validate_json(body)
+    _check_cookie(data, clictx)
+    delta = data.data
+    current = cast(Tournament | None, clictx.itc.get("tournament"))
+    if current is None or current.version != delta.base:
+        # The sender is expected to post the entire tournament instead:
+        version = None if current is None else current.version
+        logger.info(f"Received delta {delta} from {peer}, but have version {version}")
+        raise HTTPException(
+            status_code=HTTP_409_CONFLICT,
+            detail=f"Delta applies to version {delta.base}, not {version}",
+        )
+
+    tournament = delta.apply(current)
+    logger.info(f"Received delta {delta} from tptools at {peer}: {tournament}")
+    clictx.itc.set("tournament", tournament)
+    return {
+        "status": f"Received delta: {delta}",
+        "version": tournament.version,
+    }
+
+
+@recvapp.get("/tournament", response_model=Tournament)
 async def serve_tournament(
     peer: Annotated[str, Depends(get_peer)],
     tournament: Annotated[Tournament, Depends(get_tournament)],
-) -> Tournament:
+    accept_encoding: Annotated[str | None, Header()] = None,
+) -> Response:
     # TODO: this may not belong here, as this is tp_recv, and we are technically
     # serving, but there is also no other use-case right now for this endpoint, so…
     logger.debug(
         f"Returning in response to tournament request from {peer}: {tournament}"
     )
-    return tournament
+    if (body := _bodies.get(tournament.version)) is None:
+        body = EncodedBody(tournament.dump_json())
+        _bodies.put(tournament.version, body)
+    return encoded_response(body, accept_encoding, media_type="application/json")
+
+
+@recvapp.get("/tournament/stream")
+async def stream_tournament(
+    peer: Annotated[str, Depends(get_peer)],
+    stream: Annotated[TournamentStream, Depends(get_tournament_stream)],
+    last_event_id: Annotated[str | None, Header()] = None,
+    since: str | None = None,
+) -> StreamingResponse:
+    since = since or last_event_id
+    logger.info(f"Streaming tournament to {peer} (since version {since})…")
+    return StreamingResponse(
+        stream.events(since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @asynccontextmanager
@@ -72,6 +267,7 @@ async def setup_to_receive_tournament_post(
 
     logger.debug("Starting squoresrv configuration…")
     recvapp.state.clictx = clictx
+    recvapp.state.stream = stream = TournamentStream()
     clictx.api.mount(path=api_path, app=recvapp, name="squore")
     logger.info(f"Configured the app to receive tptools data at {api_path}")
 
@@ -83,7 +279,23 @@ async def setup_to_receive_tournament_post(
             else await bootstrap_tournament_from_url(Tournament, url),
         )
 
-    yield bootstrap_initial_tournament()
+    def serialise(tournament: Tournament) -> TournamentDump:
+        # The version is computed lazily, and also needs serialising:
+        _ = tournament.version
+        return TournamentDelta.dump(tournament)
+
+    async def callback(tournament: Tournament) -> None:
+        # Serialising is the expensive bit, so it happens off the event loop:
+        dump = await asyncio.to_thread(serialise, tournament)
+        stream.publish(tournament, dump)
+
+    updates_gen = cast(AsyncGenerator[Tournament], clictx.itc.updates("tournament"))
+
+    async def tp_recv_tasks() -> None:
+        await bootstrap_initial_tournament()
+        await react_to_data_update(updates_gen, callback=callback)
+
+    yield tp_recv_tasks()
 
 
 @plugin
@@ -1,23 +1,48 @@
 import asyncio
+import gzip
+import hashlib
+import importlib
 import json
 import logging
+import threading
+import zlib
+from collections.abc import Iterable
 from dataclasses import dataclass
-from typing import Annotated, Any, Callable, TypedDict, cast
+from typing import Annotated, Any, Callable, Never, TypedDict, cast
 
 import click
 from click_async_plugins import CliContext as _CliContext
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi import Response as ServerResponse
 from fastapi.requests import HTTPConnection
-from httpx import URL, AsyncClient, HTTPError, InvalidURL
+from httpx import (
+    URL,
+    AsyncClient,
+    HTTPError,
+    InvalidURL,
+    Limits,
+    Response,
+    Timeout,
+)
 from httpx import codes as status_codes
 from pydantic import BaseModel, ValidationError
-from starlette.status import HTTP_424_FAILED_DEPENDENCY
+from starlette.status import (
+    HTTP_400_BAD_REQUEST,
+    HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+    HTTP_424_FAILED_DEPENDENCY,
+)
 
 from ..filewatcher import FileWatcher
 from ..tournament import Tournament
 
 logger = logging.getLogger(__name__)
 
+HTTP_TIMEOUT = 5.0
+HTTP_MAX_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY = 30.0
+GZIP_LEVEL = 6
+COMPRESS_MIN_SIZE = 1024
+
 
 @dataclass()
 class CliContext(_CliContext):
@@ -98,6 +123,193 @@ def validate_urls(
     return ret
 
 
+def make_etag(*parts: Any) -> str:
+    # The parts only need to have a stable repr() for as long as the server runs,
+    # which is the case for str, int, None, and tuples thereof:
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12).hexdigest()
+    # Weak, because the same tag is sent with the compressed and uncompressed
+    # representations, which differ byte for byte (RFC 9110, 8.8.3):
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    # If-None-Match uses the weak comparison function (RFC 9110, 13.1.2):
+    return etag.removeprefix("W/") in (
+        tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+    )
+
+
+type Coder = Callable[[bytes], bytes]
+
+
+def _import_zstd() -> Any | None:
+    # The standard library only has Zstandard from Python 3.14:
+    try:
+        return importlib.import_module("compression.zstd")
+
+    except ImportError:
+        return None
+
+
+_zstd = _import_zstd()
+
+# Content codings in order of preference, mapped to compressor and decompressor:
+CONTENT_CODINGS: dict[str, tuple[Coder, Coder]] = {
+    **({"zstd": (_zstd.compress, _zstd.decompress)} if _zstd is not None else {}),
+    "gzip": (
+        lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0),
+        gzip.decompress,
+    ),
+}
+
+# What decompressors raise on corrupt data:
+DECODE_ERRORS: tuple[type[Exception], ...] = (
+    OSError,
+    EOFError,
+    zlib.error,
+    *((_zstd.ZstdError,) if _zstd is not None else ()),
+)
+
+
+def negotiate_content_coding(
+    accept_encoding: str | None, codings: Iterable[str] = CONTENT_CODINGS
+) -> str | None:
+    # The first of the codings that the Accept-Encoding header (RFC 9110, 12.5.3)
+    # does not rule out, or None for no compression:
+    if not accept_encoding:
+        return None
+
+    qvalues: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        qvalue = 1.0
+        if (param := params.strip()).startswith("q="):
+            try:
+                qvalue = float(param[2:])
+            except ValueError:
+                qvalue = 0.0
+        qvalues[coding.strip().lower()] = qvalue
+
+    wildcard = qvalues.get("*", 0.0)
+    for coding in codings:
+        if qvalues.get(coding, wildcard) > 0:
+            return coding
+
+    return None
+
+
+class EncodedBody:
+    # A body, and its compressed forms, which are made on first use and kept,
+    # so that a body shared between requests is compressed only once:
+    def __init__(self, data: bytes) -> None:
+        self._data = data
+        self._encoded: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"<{self.__class__.__name__}({len(self._data)} bytes, "
+            f"encoded: {', '.join(self._encoded) or 'none'})>"
+        )
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def data(self) -> bytes:
+        return self._data
+
+    def encode(self, coding: str | None) -> bytes:
+        if coding is None:
+            return self._data
+
+        with self._lock:
+            if (data := self._encoded.get(coding)) is None:
+                compress, _ = CONTENT_CODINGS[coding]
+                data = self._encoded[coding] = compress(self._data)
+            return data
+
+
+def encoded_response(
+    body: EncodedBody,
+    accept_encoding: str | None,
+    *,
+    media_type: str,
+    headers: dict[str, str] | None = None,
+) -> ServerResponse:
+    coding = (
+        negotiate_content_coding(accept_encoding)
+        if len(body) >= COMPRESS_MIN_SIZE
+        else None
+    )
+    headers = (headers or {}) | {"Vary": "Accept-Encoding"}
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    return ServerResponse(body.encode(coding), media_type=media_type, headers=headers)
+
+
+async def read_request_body(request: Request) -> bytes | Never:
+    body = await request.body()
+    coding = request.headers.get("Content-Encoding", "identity").strip().lower()
+    if coding == "identity":
+        return body
+
+    if coding not in CONTENT_CODINGS:
+        raise HTTPException(
+            status_code=HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail=f"Unsupported Content-Encoding: {coding}",
+            headers={"Accept-Encoding": ", ".join(CONTENT_CODINGS)},
+        )
+
+    _, decompress = CONTENT_CODINGS[coding]
+    try:
+        return decompress(body)
+
+    except DECODE_ERRORS as err:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"Cannot decode {coding} request body: {err}",
+        ) from err
+
+
+class ChangeNotifier:
+    # Lets any number of waiters block until the next change. Each change sets
+    # the current event and replaces it with a fresh one, so waiters need to get
+    # hold of the event before checking whether they are up-to-date, or they
+    # might miss a change happening in between:
+    def __init__(self) -> None:
+        self._event = asyncio.Event()
+        self._changes = 0
+
+    @property
+    def changes(self) -> int:
+        return self._changes
+
+    @property
+    def event(self) -> asyncio.Event:
+        return self._event
+
+    def notify(self) -> None:
+        self._changes += 1
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait(self, event: asyncio.Event, timeout: float | None) -> bool:
+        try:
+            async with asyncio.timeout(timeout):
+                await event.wait()
+                return True
+
+        except TimeoutError:
+            return False
+
+
 class PostData[T: BaseModel](BaseModel):
     cookie: int
     data: T
@@ -106,19 +318,38 @@ class PostData[T: BaseModel](BaseModel):
 class RequestArgs(TypedDict):
     method: str
     url: URL
-    content: str | None
+    content: str | bytes | None
     headers: dict[str, str]
 
 
-async def http_request(
+def make_http_client(
+    *,
+    timeout: float = HTTP_TIMEOUT,
+    max_connections: int = HTTP_MAX_CONNECTIONS,
+    keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+    **kwargs: Any,
+) -> AsyncClient:
+    # A client is a connection pool, and meant to be long-lived, so that
+    # repeated requests to the same host can reuse connections:
+    return AsyncClient(
+        timeout=Timeout(timeout),
+        limits=Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+        **kwargs,
+    )
+
+
+def make_request_args(
     method: str,
     url: URL,
     *,
     data: BaseModel | None = None,
-    retries: int = 3,
-    sleep: float = 1,
+    content: bytes | None = None,
     to_json_fn: Callable[..., str] | None = None,
-) -> dict[str, Any] | None:
+) -> RequestArgs:
     request_args = RequestArgs(method=method, url=url, content=None, headers={})
     if data is not None:
         to_json_fn = to_json_fn or (
@@ -128,33 +359,81 @@ async def http_request(
         request_args["content"] = to_json_fn(data)
         request_args["headers"] = {"Content-Type": "application/json"}
 
+    elif content is not None:
+        # Pre-serialised JSON, which callers can share between requests:
+        logger.debug(f"Posting {len(content)} bytes of JSON to {url}")
+        request_args["content"] = content
+        request_args["headers"] = {"Content-Type": "application/json"}
+
+    return request_args
+
+
+async def send_request(client: AsyncClient, request_args: RequestArgs) -> Response:
+    # A single attempt, which raises HTTPError if there is no response:
+    method = request_args["method"]
+    resp = await client.request(**request_args)
+
+    if resp.status_code == status_codes.OK:
+        logger.info(
+            f"{method} request with "
+            f"{len(resp.request.content)} bytes of data "
+            f"yielded a response of {len(resp.content)} bytes"
+        )
+
+    else:
+        logger.info(
+            f"{method} request with "
+            f"{len(resp.request.content)} bytes of data "
+            f"yielded status {resp.status_code}, {resp.reason_phrase}"
+        )
+
+    return resp
+
+
+def response_json(resp: Response) -> dict[str, Any] | None:
+    try:
+        return cast(dict[str, Any], resp.json())
+
+    except json.JSONDecodeError as err:
+        logger.warning(
+            f"{resp.request.method} request to {resp.request.url} "
+            f"yielded an invalid JSON response: {err}."
+        )
+        return None
+
+
+async def http_request(
+    method: str,
+    url: URL,
+    *,
+    client: AsyncClient | None = None,
+    data: BaseModel | None = None,
+    content: bytes | None = None,
+    retries: int = 3,
+    sleep: float = 1,
+    to_json_fn: Callable[..., str] | None = None,
+) -> dict[str, Any] | None:
+    if client is None:
+        # One-off requests get a client of their own:
+        async with make_http_client() as client:
+            return await http_request(
+                method,
+                url,
+                client=client,
+                data=data,
+                content=content,
+                retries=retries,
+                sleep=sleep,
+                to_json_fn=to_json_fn,
+            )
+
+    request_args = make_request_args(
+        method, url, data=data, content=content, to_json_fn=to_json_fn
+    )
+
     while True:
         try:
-            async with AsyncClient() as client:
-                resp = await client.request(**request_args)
-                rt: dict[str, Any] = resp.json()
-
-                if resp.status_code == status_codes.OK:
-                    logger.info(
-                        f"{method} request with "
-                        f"{len(resp.request.content)} bytes of data "
-                        f"yielded a response of {len(resp.content)} bytes"
-                    )
-
-                else:
-                    logger.info(
-                        f"{method} request with "
-                        f"{len(resp.request.content)} bytes of data "
-                        f"yielded status {resp.status_code}, {resp.reason_phrase}"
-                    )
-
-                return rt
-
-        except json.JSONDecodeError as err:
-            logger.warning(
-                f"{method} request to {url} yielded an invalid JSON response: {err}."
-            )
-            return None
+            return response_json(await send_request(client, request_args))
 
         except HTTPError as err:
             if retries > 0:
@@ -173,10 +452,10 @@ async def http_request(
 
 
 async def bootstrap_tournament_from_url[T: Tournament](
-    tournament_class: type[T], url: URL
+    tournament_class: type[T], url: URL, *, client: AsyncClient | None = None
 ) -> T | None:
     logger.debug(f"Fetching initial {tournament_class.__qualname__} from {url}…")
-    if (tdata := await http_request("GET", url)) is None:
+    if (tdata := await http_request("GET", url, client=client)) is None:
         logger.warning(
             f"Failed to fetch initial {tournament_class.__qualname__} from {url}"
         )
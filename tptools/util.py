@@ -5,9 +5,10 @@ import pathlib
 from collections.abc import Callable, Generator, Iterable, Mapping, MutableMapping
 from datetime import datetime
 from enum import IntEnum
-from typing import Any, Never, TextIO
+from typing import Any, Never, TextIO, cast
 
 from dateutil.parser import parse as date_parser
+from pydantic import TypeAdapter
 from sqlalchemy import Dialect, Integer, TypeDecorator
 
 
@@ -256,3 +257,24 @@ def flatten_dict(
         else:
             items.append((new_key, value))
     return dict(items)
+
+
+# Output we generate ourselves need not be validated on every request, unless
+# asked for, e.g. during development or testing:
+_trusted_output = not is_truish(os.environ.get("TPTOOLS_VALIDATE_OUTPUT"))
+
+
+def set_trusted_output(trusted: bool) -> bool:
+    global _trusted_output
+    previous, _trusted_output = _trusted_output, trusted
+    return previous
+
+
+def is_trusted_output() -> bool:
+    return _trusted_output
+
+
+def validate_output[T](adapter: TypeAdapter[T], data: Any) -> T:
+    if _trusted_output:
+        return cast(T, data)
+    return adapter.validate_python(data)
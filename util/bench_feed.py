@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+#
+# Time rendering a full Squore matches feed, with and without validating the
+# output structures (see TPTOOLS_VALIDATE_OUTPUT).
+#
+# Usage: ./bench_feed.py [path/to/tournament.sqlite] [iterations]
+#
+import asyncio
+import pathlib
+import sys
+import timeit
+
+from sqlmodel import Session, create_engine
+
+from tptools import load_tournament
+from tptools.entry import clear_name_cache
+from tptools.ext.squore import MatchesFeed, SquoreTournament
+from tptools.util import set_trusted_output
+
+DEFAULT_DB_PATH = (
+    pathlib.Path(__file__).parent.parent / "integration" / "anon_tournament.sqlite"
+)
+
+
+def main(db_path: pathlib.Path, iterations: int) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    with Session(engine) as session:
+        tournament = SquoreTournament.from_tournament(
+            asyncio.run(load_tournament(session))
+        )
+    print(f"Tournament: {tournament}")
+
+    def render() -> None:
+        # Without the name cache, this is the cost of the first request after
+        # a tournament update:
+        clear_name_cache()
+        _ = MatchesFeed(tournament=tournament).model_dump()
+
+    results: dict[bool, float] = {}
+    for trusted in (False, True):
+        set_trusted_output(trusted)
+        render()
+        results[trusted] = timeit.timeit(render, number=iterations) / iterations
+        print(
+            f"{'trusted' if trusted else 'validated'}: "
+            f"{results[trusted] * 1000:.2f}ms per feed"
+        )
+
+    saving = results[False] - results[True]
+    print(f"saving: {saving * 1000:.2f}ms per feed ({saving / results[False]:.0%})")
+
+
+if __name__ == "__main__":
+    main(
+        pathlib.Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_DB_PATH,
+        int(sys.argv[2]) if len(sys.argv) > 2 else 50,
+    )